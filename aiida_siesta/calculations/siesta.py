@@ -1,4 +1,8 @@
+import io
 import os
+import shlex
+from collections import OrderedDict
+import numpy as np
 from aiida import orm
 from aiida.common import CalcInfo, CodeInfo, InputValidationError
 from aiida.common.constants import elements
@@ -12,6 +16,23 @@ from aiida_siesta.data.ion import IonData
 
 # See the LICENSE.txt and AUTHORS.txt files.
 
+# Dictionary to get the atomic number of a given element
+_SYMBOL_TO_Z = {v['symbol']: k for k, v in elements.items()}
+
+# Error messages of the validation of the `parameters` input
+_PAO_IN_PARAMETERS_MESSAGE = (
+    "You can not put PAO options in the parameters input port "
+    "they belong to the basis input port "
+)
+_BLOCKED_KEYWORD_MESSAGE = "You cannot specify explicitly the '{}' flag in the input parameters"
+
+# Row templates of the cards, parsed once at import time
+_SPECIES_ROW_FMT = "{:5} {:5} {:5}\n".format
+_ATOMIC_POSITION_ROW = "%18.10f %18.10f %18.10f %4d %6s %6d\n"
+_KPT_FMT = "{:6} {:6} {:6} {:18.10f}\n".format
+_BAND_FMT = "{:3} {:8.3f} {:8.3f} {:8.3f} {:1} \n".format
+_BANDPT_FMT = "{:8.3f} {:8.3f} {:8.3f} \n".format
+
 ###################################################################################
 ## Since aiida 1.0 There is now a clear distinction between Nodes and Processes. ##
 ## A calculation is now a process and it is treated as a Process class similar   ##
@@ -44,15 +65,12 @@ class SiestaCalculation(CalcJob):
     # Parameters stored as class variables
     # 1) Keywords that cannot be set (already canonized by FDFDict)
     # 2) Filepaths of certain outputs
-    _aiida_blocked_keywords = [FDFDict.translate_key('system-name'), FDFDict.translate_key('system-label')]
-    _aiida_blocked_keywords.append(FDFDict.translate_key('number-of-species'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('number-of-atoms'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('lattice-constant'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('atomic-coordinates-format'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('use-tree-timer'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('xml-write'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('dm-use-save-dm'))
-    _aiida_blocked_keywords.append(FDFDict.translate_key('geometry-must-converge'))
+    _aiida_blocked_keywords = frozenset(
+        FDFDict.translate_key(key) for key in (
+            'system-name', 'system-label', 'number-of-species', 'number-of-atoms', 'lattice-constant',
+            'atomic-coordinates-format', 'use-tree-timer', 'xml-write', 'dm-use-save-dm', 'geometry-must-converge'
+        )
+    )
     _PSEUDO_SUBFOLDER = './'
     _OUTPUT_SUBFOLDER = './'
     _JSON_FILE = 'time.json'
@@ -74,6 +92,12 @@ class SiestaCalculation(CalcJob):
     # in restarts, it will copy the previous folder in the following one
     _restart_copy_to = _OUTPUT_SUBFOLDER
 
+    # Validated content of the `parameters` inputs, keyed by the uuid of the node.
+    # Stored nodes are immutable, so a launch with an already seen `parameters` node
+    # skips the deserialization and the checks. At most `_PARAMS_CACHE_SIZE` entries are kept.
+    _params_validation_cache = OrderedDict()
+    _PARAMS_CACHE_SIZE = 128
+
     @classmethod
     def define(cls, spec):
         super(SiestaCalculation, cls).define(spec)
@@ -148,6 +172,13 @@ class SiestaCalculation(CalcJob):
 
         pseudos = self.inputs.pseudos
 
+        # To have easy access to inputs metadata options. The options accessed
+        # several times are resolved here once and for all.
+        metadataoption = self.inputs.metadata.options
+        prefix = metadataoption.prefix
+        input_file_name = metadataoption.input_filename
+        output_file_name = metadataoption.output_filename
+
         if 'kpoints' in self.inputs:
             kpoints = self.inputs.kpoints
         else:
@@ -159,8 +190,7 @@ class SiestaCalculation(CalcJob):
             basis = None
 
         if 'settings' in self.inputs:
-            settings = self.inputs.settings.get_dict()
-            settings_dict = _uppercase_dict(settings, dict_name='settings')
+            settings_dict = _uppercase_dict(self.inputs.settings.get_dict(), dict_name='settings')
         else:
             settings_dict = {}
 
@@ -198,6 +228,9 @@ class SiestaCalculation(CalcJob):
         #The list `floating_species_names` is used later and must be empty list if there aren't floating_orbs.
         structure = clone_structure(original_structure)
         floating_species_names = []
+        floating = None
+        # The content of the basis node is deserialized only once, `basis_dict` is reused afterwards
+        basis_dict = None
         #Add ghosts to the structure
         if basis is not None:
             basis_dict = basis.get_dict()
@@ -213,35 +246,31 @@ class SiestaCalculation(CalcJob):
                     structure.append_atom(position=item[2], symbols=[item[1]], name=item[0])
                     floating_species_names.append(item[0])
         #Check each kind in the structure (including freshly added ghosts) have a corresponding pseudo.
-        kinds = [kind.name for kind in structure.kinds]
-        if set(kinds) != set(pseudos.keys()):
+        #The structural properties are resolved once, from now on the cloned structure is not modified.
+        kinds_list = structure.kinds
+        sites_list = structure.sites
+        cell = np.asarray(structure.cell, dtype=np.float64)
+        #Kind names are unique, so equal lengths and inclusion are enough to have the same sets.
+        pseudos_keys = pseudos.keys()
+        if len(pseudos_keys) != len(kinds_list) or not all(kind.name in pseudos_keys for kind in kinds_list):
             raise ValueError(
-                'Mismatch between the defined pseudos and the list of kinds of the structure.\n',
-                'Pseudos: {} \n'.format(', '.join(list(pseudos.keys()))),
-                'Kinds (including ghosts): {}'.format(', '.join(list(kinds))),
+                'Mismatch between the defined pseudos and the list of kinds of the structure.\n'
+                'Pseudos: {} \n'
+                'Kinds (including ghosts): {}'.format(
+                    ', '.join(pseudos_keys), ', '.join(kind.name for kind in kinds_list)
+                )
             )
 
         # ============== Preprocess of input parameters ===============
 
-        input_params = FDFDict(parameters.get_dict())
         # Look for blocked keywords and add the proper values to the dictionary
-        for key in input_params:
-            if "pao" in key:
-                raise InputValidationError(
-                    "You can not put PAO options in the parameters input port "
-                    "they belong to the basis input port "
-                )
-            if key in self._aiida_blocked_keywords:
-                raise InputValidationError(
-                    "You cannot specify explicitly the '{}' flag in the "
-                    "input parameters".format(input_params.get_last_untranslated_key(key))
-                )
-        input_params.update({'system-name': self.inputs.metadata.options.prefix})
-        input_params.update({'system-label': self.inputs.metadata.options.prefix})
+        input_params = self._get_validated_parameters(parameters)
+        input_params.update({'system-name': prefix})
+        input_params.update({'system-label': prefix})
         input_params.update({'use-tree-timer': 'T'})
         input_params.update({'xml-write': 'T'})
-        input_params.update({'number-of-species': len(structure.kinds)})
-        input_params.update({'number-of-atoms': len(structure.sites)})
+        input_params.update({'number-of-species': len(kinds_list)})
+        input_params.update({'number-of-atoms': len(sites_list)})
         input_params.update({'geometry-must-converge': 'T'})
         input_params.update({'lattice-constant': '1.0 Ang'})
         input_params.update({'atomic-coordinates-format': 'Ang'})
@@ -263,65 +292,68 @@ class SiestaCalculation(CalcJob):
         # ============== Preparation of input data ===============
 
         # ---------------- CELL_PARAMETERS ------------------------
-        cell_parameters_card = "%block lattice-vectors\n"
-        for vector in structure.cell:
-            cell_parameters_card += ("{0:18.10f} {1:18.10f} {2:18.10f}" "\n".format(*vector))
-        cell_parameters_card += "%endblock lattice-vectors\n"
+        cell_buffer = io.StringIO()
+        np.savetxt(cell_buffer, cell, fmt="%18.10f %18.10f %18.10f")
+        cell_parameters_card = "%block lattice-vectors\n" + cell_buffer.getvalue() + "%endblock lattice-vectors\n"
+        del cell_buffer
 
         # --------------ATOMIC_SPECIES & PSEUDOS-------------------
         # Subfolder that will contain the pseudopotentials and output data
         folder.get_subfolder(self._PSEUDO_SUBFOLDER, create=True)
         folder.get_subfolder(self._OUTPUT_SUBFOLDER, create=True)
         atomic_species_card_list = []
-        # Dictionary to get the atomic number of a given element
-        datmn = {v['symbol']: k for k, v in elements.items()}
+        append_species = atomic_species_card_list.append
         spind = {}
         spcount = 0
-        for kind in structure.kinds:
+        # pseudos uuid -> (pseudo node, names of the files required by siesta)
+        pseudos_destinations = {}
+        for kind in kinds_list:
             spcount += 1  # species count
             spind[kind.name] = spcount
-            atomic_number = datmn[kind.symbol]
+            atomic_number = _SYMBOL_TO_Z[kind.symbol]
             # Siesta expects negative atomic numbers for floating species
             if kind.name in floating_species_names:
                 atomic_number = -atomic_number
             #Create the core of the chemicalspecieslabel block
-            atomic_species_card_list.append(
-                "{0:5} {1:5} {2:5}\n".format(spind[kind.name], atomic_number, kind.name.rjust(6))
-            )
+            append_species(_SPECIES_ROW_FMT(spind[kind.name], atomic_number, kind.name.rjust(6)))
             psp = pseudos[kind.name]
             # Add this pseudo file to the list of files to copy, with the appropiate name.
             # In the case of sub-species (different kind.name but same kind.symbol, e.g.,
-            # 'C_surf', sharing the same pseudo with 'C'), we copy the file ('C.psf')
-            # twice, once as 'C.psf', and once as 'C_surf.psf'. This is required by Siesta.
-            # It is passed in form of a list of tuples with format ('node_uuid', 'filename',
+            # 'C_surf', sharing the same pseudo with 'C'), Siesta requires a file for each
+            # kind ('C.psf' and 'C_surf.psf'). The pseudo node is copied only once, the
+            # other names are symlinks created in the prepend text of the submission script.
+            # The copy is passed in form of a list of tuples with format ('node_uuid', 'filename',
             # relativedestpath'). We probably should be pre-pending 'self._PSEUDO_SUBFOLDER'
             # in the last slot, for generality, even if is not necessary for siesta.
-            if isinstance(psp, PsfData):
-                local_copy_list.append((psp.uuid, psp.filename, kind.name + ".psf"))
-            elif isinstance(psp, PsmlData):
-                local_copy_list.append((psp.uuid, psp.filename, kind.name + ".psml"))
-            else:
-                pass
-        atomic_species_card_list = (["%block chemicalspecieslabel\n"] + list(atomic_species_card_list))
-        atomic_species_card = "".join(atomic_species_card_list)
-        atomic_species_card += "%endblock chemicalspecieslabel\n"
+            extension = _get_pseudo_extension(psp)
+            if extension is not None:
+                pseudos_destinations.setdefault(psp.uuid, (psp, []))[1].append(kind.name + extension)
+        pseudo_links = []
+        for psp, destinations in pseudos_destinations.values():
+            local_copy_list.append((psp.uuid, psp.filename, destinations[0]))
+            pseudo_links.extend(
+                "ln -s {} {}".format(shlex.quote(destinations[0]), shlex.quote(dest)) for dest in destinations[1:]
+            )
+        del pseudos_destinations
+        atomic_species_card = (
+            "%block chemicalspecieslabel\n" + "".join(atomic_species_card_list) + "%endblock chemicalspecieslabel\n"
+        )
         # Free memory
         del atomic_species_card_list
 
         # --------------------- ATOMIC_POSITIONS -----------------------
-        atomic_positions_card_list = ["%block atomiccoordinatesandatomicspecies\n"]
-        countatm = 0
-        for site in structure.sites:
-            countatm += 1
-            atomic_positions_card_list.append(
-                "{0:18.10f} {1:18.10f} {2:18.10f} {3:4} {4:6} {5:6}\n".format(
-                    site.position[0], site.position[1], site.position[2], spind[site.kind_name],
-                    site.kind_name.rjust(6), countatm
-                )
-            )
-        atomic_positions_card = "".join(atomic_positions_card_list)
-        del atomic_positions_card_list  # Free memory
-        atomic_positions_card += "%endblock atomiccoordinatesandatomicspecies\n"
+        # The rows are formatted all at once, with a single `%` operation on the flattened
+        # arguments, instead of calling `format` site by site.
+        positions = np.array([site.position for site in sites_list], dtype=np.float64).reshape(-1, 3)
+        row_args = []
+        extend_args = row_args.extend
+        for countatm, (position, site) in enumerate(zip(positions.tolist(), sites_list), 1):
+            extend_args((position[0], position[1], position[2], spind[site.kind_name], site.kind_name, countatm))
+        atomic_positions_card = (
+            "%block atomiccoordinatesandatomicspecies\n" + _ATOMIC_POSITION_ROW * len(sites_list) % tuple(row_args) +
+            "%endblock atomiccoordinatesandatomicspecies\n"
+        )
+        del row_args  # Free memory
 
         # -------------------- K-POINTS ----------------------------
         # It is optional, if not specified, gamma point only is performed (default of siesta)
@@ -334,9 +366,9 @@ class SiestaCalculation(CalcJob):
             kpoints_card_list = ["%block kgrid_monkhorst_pack\n"]
             # This would fail if kpoints is not a mash (for the case of a list),
             # since in that case 'offset' is undefined.
-            kpoints_card_list.append("{0:6} {1:6} {2:6} {3:18.10f}\n".format(mesh[0], 0, 0, offset[0]))
-            kpoints_card_list.append("{0:6} {1:6} {2:6} {3:18.10f}\n".format(0, mesh[1], 0, offset[1]))
-            kpoints_card_list.append("{0:6} {1:6} {2:6} {3:18.10f}\n".format(0, 0, mesh[2], offset[2]))
+            kpoints_card_list.append(_KPT_FMT(mesh[0], 0, 0, offset[0]))
+            kpoints_card_list.append(_KPT_FMT(0, mesh[1], 0, offset[1]))
+            kpoints_card_list.append(_KPT_FMT(0, 0, mesh[2], offset[2]))
             kpoints_card = "".join(kpoints_card_list)
             kpoints_card += "%endblock kgrid_monkhorst_pack\n"
             del kpoints_card_list
@@ -352,60 +384,54 @@ class SiestaCalculation(CalcJob):
             #first, we check that the user constracted the kpoints using the cell
             #of the input structure, and not a random cell. This helps parsing
             kpcell = bandskpoints.get_attribute("cell", None)
-            if kpcell:
-                if kpcell != structure.cell:
+            if kpcell is not None:
+                if not np.array_equal(np.asarray(kpcell, dtype=np.float64), cell):
                     raise ValueError(
                         'The cell used for `bandskpoints` must be the same of the input structure.'
                         'Alternatively do not set any cell to the bandskpoints.'
                     )
             #second we rise a warning about consequences when the cell is relaxed
-            var_cell_keys = [FDFDict.translate_key("md-variable-cell"), FDFDict.translate_key("md-constant-volume")]
-            var_cell_keys.append(FDFDict.translate_key("md-relax-cell-only"))
-            for key in input_params:
-                if key in var_cell_keys:
-                    logline = (
-                        "Requested calculation of bands after a relaxation with variable cell! " +
-                        "If the symmetry of the cell will change, the kpoints path for bands will be wrong. " +
-                        "It is suggested to use the `BandGapWorkChain` instead."
-                    )
-                    if isinstance(input_params[key], str):
-                        if FDFDict.translate_key(input_params[key]) in ["t", "true", "yes"]:
-                            self.logger.warning(logline)
-                            break
-                    else:
-                        if input_params[key] is True:
-                            self.logger.warning(logline)
-                            break
+            var_cell_keys = frozenset(
+                FDFDict.translate_key(key) for key in ("md-variable-cell", "md-constant-volume", "md-relax-cell-only")
+            )
+            logline = (
+                "Requested calculation of bands after a relaxation with variable cell! " +
+                "If the symmetry of the cell will change, the kpoints path for bands will be wrong. " +
+                "It is suggested to use the `BandGapWorkChain` instead."
+            )
+            #only the few variable-cell keys are looked up, whatever the size of the parameters
+            for key in var_cell_keys:
+                if key not in input_params:
+                    continue
+                value = input_params[key]
+                if (isinstance(value, str) and FDFDict.translate_key(value) in ("t", "true", "yes")) or value is True:
+                    self.logger.warning(logline)
+                    break
             #the band line scale
             bandskpoints_card_list = ["BandLinesScale ReciprocalLatticeVectors\n"]
+            append_bands = bandskpoints_card_list.append
             #set the BandPoints
-            if bandskpoints.labels is None:
-                bandskpoints_card_list.append("%block BandPoints\n")
-                for kpo in bandskpoints.get_kpoints():
-                    bandskpoints_card_list.append("{0:8.3f} {1:8.3f} {2:8.3f} \n".format(kpo[0], kpo[1], kpo[2]))
+            #labels and kpoints are attributes of the node, they are fetched only once
+            labels = bandskpoints.labels
+            listforbands = bandskpoints.get_kpoints()
+            if labels is None:
+                append_bands("%block BandPoints\n")
+                for kpo in listforbands:
+                    append_bands(_BANDPT_FMT(kpo[0], kpo[1], kpo[2]))
                 fbkpoints_card = "".join(bandskpoints_card_list)
                 fbkpoints_card += "%endblock BandPoints\n"
             #set the BandLines
             else:
-                bandskpoints_card_list.append("%block BandLines\n")
-                savindx = []
-                listforbands = bandskpoints.get_kpoints()
-                for indx, label in bandskpoints.labels:
-                    savindx.append(indx)
-                rawindex = 0
-                for indx, label in bandskpoints.labels:
-                    rawindex = rawindex + 1
+                append_bands("%block BandLines\n")
+                labels = list(labels)
+                #number of points of each segment, the first point of the path counts as 1
+                indices = np.fromiter((indx for indx, _ in labels), dtype=np.int64, count=len(labels))
+                gaps = np.empty_like(indices)
+                gaps[:1] = 1
+                gaps[1:] = np.diff(indices)
+                for gap, (indx, label) in zip(gaps.tolist(), labels):
                     x, y, z = listforbands[indx]
-                    if rawindex == 1:
-                        bandskpoints_card_list.append(
-                            "{0:3} {1:8.3f} {2:8.3f} {3:8.3f} {4:1} \n".format(1, x, y, z, label)
-                        )
-                    else:
-                        bandskpoints_card_list.append(
-                            "{0:3} {1:8.3f} {2:8.3f} {3:8.3f} {4:1} \n".format(
-                                indx - savindx[rawindex - 2], x, y, z, label
-                            )
-                        )
+                    append_bands(_BAND_FMT(gap, x, y, z, label))
                 fbkpoints_card = "".join(bandskpoints_card_list)
                 fbkpoints_card += "%endblock BandLines\n"
             del bandskpoints_card_list
@@ -437,72 +463,70 @@ class SiestaCalculation(CalcJob):
             # get kinds list from reference structure, in case they are not just symbols
             kinds = original_structure.kinds
             
+            # the ghosts do not move, their positions are built only once
             if floating is not None:
-                ghost_positions = []
-                for item in floating:
-                    ghost_positions.append(item[2])
-                    
-            neb_image_prefix = self.inputs.metadata.options.neb_xyz_prefix
-            
+                ghost_positions = np.asarray([item[2] for item in floating], dtype=np.float64).reshape(-1, 3)
+
+            neb_image_prefix = metadataoption.neb_xyz_prefix
+
             # loop over structures
             for i in range(neb_input_images.numsteps):
-                s_image = neb_input_images.get_step_structure(i,custom_kinds=kinds)
+                s_image = neb_input_images.get_step_structure(i, custom_kinds=kinds)
                 # write a xyz file with a standard prefix in the folder
                 # Note that currently we do not want the labels in these files
-                filename= folder.get_abs_path("{}{}.xyz".format(neb_image_prefix,i))
-                positions = [ s.position for s in s_image.sites]
+                filename = folder.get_abs_path("{}{}.xyz".format(neb_image_prefix, i))
+                positions = np.asarray([s.position for s in s_image.sites], dtype=np.float64).reshape(-1, 3)
                 # Possibly append ghost atoms (currently needed)
                 if floating is not None:
-                    for pos in ghost_positions:
-                        positions.append((pos[0],pos[1],pos[2]))
+                    positions = np.vstack([positions, ghost_positions])
 
-                with open(filename,"w") as f:
+                with open(filename, "w") as f:
                     #
                     # Write first two lines
                     #
                     f.write("{}\n".format(len(positions)))
                     f.write("----- \n")
-                    for pos in positions:
-                        f.write("{} {} {}\n".format(pos[0],pos[1],pos[2]))
+                    np.savetxt(f, positions, fmt="%.10f %.10f %.10f")
 
         # ====================== FDF file creation ========================
 
-        # To have easy access to inputs metadata options
-        metadataoption = self.inputs.metadata.options
+        input_filename = folder.get_abs_path(input_file_name)
+
+        # The content of the file is collected in a list of chunks and written in one go
+        fdf_chunks = []
+        append_chunk = fdf_chunks.append
+
+        # here print keys and values tp file
+        fdf_chunks.extend("%s %s\n" % (k, v) for k, v in sorted(input_params.get_filtered_items()))
+
+        # Basis set info is processed just like the general
+        # parameters section. Some discipline is needed to
+        # put any basis-related parameters (including blocks)
+        # in the basis dictionary in the input script.
+        if basis_dict is not None:
+            append_chunk("#\n# -- Basis Set Info follows\n#\n")
+            fdf_chunks.extend("%s %s\n" % (k, v) for k, v in basis_dict.items())
+
+        # Write previously generated cards now
+        append_chunk("#\n# -- Structural Info follows\n#\n")
+        append_chunk(atomic_species_card)
+        append_chunk(cell_parameters_card)
+        append_chunk(atomic_positions_card)
+        if kpoints is not None:
+            append_chunk("#\n# -- K-points Info follows\n#\n")
+            append_chunk(kpoints_card)
+        if bandskpoints is not None:
+            append_chunk("#\n# -- Bandlines/Bandpoints Info follows\n#\n")
+            append_chunk(fbkpoints_card)
+
+        # Write max wall-clock time
+        append_chunk("#\n# -- Max wall-clock time block\n#\n")
+        append_chunk("max.walltime {}\n".format(metadataoption.max_wallclock_seconds))
 
-        # input_filename = self.inputs.metadata.options.input_filename
-        input_filename = folder.get_abs_path(metadataoption.input_filename)
-
-        with open(input_filename, 'w') as infile:
-            # here print keys and values tp file
-
-            for k, v in sorted(input_params.get_filtered_items()):
-                infile.write("%s %s\n" % (k, v))
-
-            # Basis set info is processed just like the general
-            # parameters section. Some discipline is needed to
-            # put any basis-related parameters (including blocks)
-            # in the basis dictionary in the input script.
-            if basis is not None:
-                infile.write("#\n# -- Basis Set Info follows\n#\n")
-                for k, v in basis_dict.items():
-                    infile.write("%s %s\n" % (k, v))
-
-            # Write previously generated cards now
-            infile.write("#\n# -- Structural Info follows\n#\n")
-            infile.write(atomic_species_card)
-            infile.write(cell_parameters_card)
-            infile.write(atomic_positions_card)
-            if kpoints is not None:
-                infile.write("#\n# -- K-points Info follows\n#\n")
-                infile.write(kpoints_card)
-            if bandskpoints is not None:
-                infile.write("#\n# -- Bandlines/Bandpoints Info follows\n#\n")
-                infile.write(fbkpoints_card)
-
-            # Write max wall-clock time
-            infile.write("#\n# -- Max wall-clock time block\n#\n")
-            infile.write("max.walltime {}\n".format(metadataoption.max_wallclock_seconds))
+        # A buffer large enough to avoid intermediate flushes for common sizes of the file
+        with open(input_filename, 'w', buffering=1 << 20) as infile:
+            infile.write("".join(fdf_chunks))
+        del fdf_chunks  # Free memory
 
         # ====================== Code and Calc info ========================
         # Code information object and Calc information object are now
@@ -513,8 +537,8 @@ class SiestaCalculation(CalcJob):
 
         codeinfo = CodeInfo()
         codeinfo.cmdline_params = list(cmdline_params)
-        codeinfo.stdin_name = metadataoption.input_filename
-        codeinfo.stdout_name = metadataoption.output_filename
+        codeinfo.stdin_name = input_file_name
+        codeinfo.stdout_name = output_file_name
         codeinfo.code_uuid = code.uuid
 
         calcinfo = CalcInfo()
@@ -523,59 +547,109 @@ class SiestaCalculation(CalcJob):
             calcinfo.cmdline_params = list(cmdline_params)
         calcinfo.local_copy_list = local_copy_list
         calcinfo.remote_copy_list = remote_copy_list
-        calcinfo.stdin_name = metadataoption.input_filename
-        calcinfo.stdout_name = metadataoption.output_filename
+        calcinfo.stdin_name = input_file_name
+        calcinfo.stdout_name = output_file_name
         calcinfo.codes_info = [codeinfo]
+        if pseudo_links:
+            calcinfo.prepend_text = "\n".join(pseudo_links)
         # Retrieve by default: the output file, the xml file, the
         # messages file, and the json timing file.
         # If bandskpoints, also the bands file is added to the retrieve list.
-        calcinfo.retrieve_list = []
-        xml_file = str(metadataoption.prefix) + ".xml"
-        bands_file = str(metadataoption.prefix) + ".bands"
-        calcinfo.retrieve_list.append(metadataoption.output_filename)
-        #calcinfo.retrieve_list.append(metadataoption.input_filename)
-        calcinfo.retrieve_list.append(xml_file)
-        calcinfo.retrieve_list.append(self._JSON_FILE)
-        calcinfo.retrieve_list.append(self._MESSAGES_FILE)
-        calcinfo.retrieve_list.append("*.ion.xml")
+        retrieve_list = [
+            output_file_name,
+            f"{prefix}.xml",
+            self._JSON_FILE,
+            self._MESSAGES_FILE,
+            "*.ion.xml",
+        ]
 
         if bandskpoints is not None:
-            calcinfo.retrieve_list.append(bands_file)
+            retrieve_list.append(f"{prefix}.bands")
 
         # Retrieve xyz files if doing NEB
         if neb_input_images is not None:
-            calcinfo.retrieve_list.append("image*.xyz")
+            retrieve_list.append("image*.xyz")
             if lua_script is not None:
-                calcinfo.retrieve_list.append(metadataoption.neb_results_file)
-            
+                retrieve_list.append(metadataoption.neb_results_file)
+
         # Any other files specified in the settings dictionary
-        settings_retrieve_list = settings_dict.pop('ADDITIONAL_RETRIEVE_LIST', [])
-        calcinfo.retrieve_list += settings_retrieve_list
+        retrieve_list.extend(settings_dict.pop('ADDITIONAL_RETRIEVE_LIST', []))
+        calcinfo.retrieve_list = retrieve_list
 
         return calcinfo
 
+    @classmethod
+    def _get_validated_parameters(cls, parameters):
+        """
+        Return a FDFDict with the content of the `parameters` Dict, after checking that
+        no PAO option and no keyword managed by the plugin is present.
+
+        :param parameters: the `parameters` input node
+        :return: a new FDFDict instance, that can be modified by the caller
+        """
+        cache = cls._params_validation_cache
+        uuid = parameters.uuid
+
+        if parameters.is_stored and uuid in cache:
+            cache.move_to_end(uuid)
+            return FDFDict(cache[uuid])
+
+        input_params = FDFDict(parameters.get_dict())
+        # PAO blocks are translated to '%blockpao...', so the test is not for a prefix
+        blocked_keywords = cls._aiida_blocked_keywords
+        for key in input_params:
+            if "pao" in key:
+                raise InputValidationError(_PAO_IN_PARAMETERS_MESSAGE)
+            if key in blocked_keywords:
+                raise InputValidationError(_BLOCKED_KEYWORD_MESSAGE.format(input_params.get_last_untranslated_key(key)))
+
+        if parameters.is_stored:
+            cache[uuid] = input_params.get_untranslated_dict()
+            if len(cache) > cls._PARAMS_CACHE_SIZE:
+                cache.popitem(last=False)
+
+        return input_params
+
     @classmethod
     def inputs_generator(cls):  # pylint: disable=no-self-argument,no-self-use
         from aiida_siesta.utils.inputs_generators import SiestaCalculationInputsGenerator
         return SiestaCalculationInputsGenerator(cls)
 
 
+def _get_pseudo_extension(psp):
+    """
+    Return the extension of the file that Siesta expects for the pseudo `psp`,
+    or None if the type of pseudo is not supported.
+    """
+    if isinstance(psp, PsfData):
+        return ".psf"
+    if isinstance(psp, PsmlData):
+        return ".psml"
+    return None
+
+
 def _uppercase_dict(indic, dict_name):
-    from collections import Counter
 
     if not isinstance(indic, dict):
         raise TypeError("_uppercase_dict accepts only dictionaries as argument")
 
-    new_dict = dict((str(k).upper(), v) for k, v in indic.items())
+    # Single pass, the repeated keys are detected while building the new dictionary
+    new_dict = {}
+    double_keys = []
+    upper = str.upper
+    for k, v in indic.items():
+        upper_key = upper(str(k))
+        if upper_key in new_dict:
+            double_keys.append(upper_key)
+        else:
+            new_dict[upper_key] = v
 
-    if len(new_dict) != len(indic):
-        num_items = Counter(str(k).upper() for k in indic.keys())
-        double_keys = ",".join([k for k, v in num_items if v > 1])
+    if double_keys:
         raise InputValidationError(
             "Inside the dictionary '{}' there are the following keys that "
             "are repeated more than once when compared case-insensitively: "
             "{}."
-            "This is not allowed.".format(dict_name, double_keys)
+            "This is not allowed.".format(dict_name, ",".join(double_keys))
         )
 
     return new_dict
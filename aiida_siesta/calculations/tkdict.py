@@ -16,6 +16,7 @@ Refined by Emanuele Bosoni in 2020
 
 from abc import abstractmethod
 from collections.abc import MutableMapping
+from functools import lru_cache
 
 
 class TKDict(MutableMapping):
@@ -48,9 +49,8 @@ class TKDict(MutableMapping):
                 message = 'invalid argument for `{}`: it only accepts a dictionary'.format(self.__class__.__name__)
                 raise RuntimeError(message)
 
-        if inp_dict is not None:
-            for inp_key in inp_dict:
-                self[inp_key] = inp_dict[inp_key]
+            for inp_key, inp_value in inp_dict.items():
+                self[inp_key] = inp_value
 
     def __setitem__(self, key, value):
         """
@@ -162,11 +162,20 @@ class FDFDict(TKDict):  # pylint: disable=too-many-ancestors
 
     @classmethod
     def translate_key(cls, key):
-        to_remove = "-.:"
-
         if not isinstance(key, str):
             raise Exception("Key name error in FDFDict")
 
-        # Unicode uses a single dictionary for translation
-        table = {ord(char): None for char in to_remove}
-        return key.translate(table).lower()
+        return _translate_fdf_key(key)
+
+
+# Unicode uses a single dictionary for translation
+_FDF_TRANSLATION_TABLE = {ord(char): None for char in "-.:"}
+
+
+@lru_cache(maxsize=1024)
+def _translate_fdf_key(key):
+    """
+    Translation rule of FDFDict. The rule is pure and the keys are mostly
+    a small vocabulary of fdf options, therefore the results are memoized.
+    """
+    return key.translate(_FDF_TRANSLATION_TABLE).lower()
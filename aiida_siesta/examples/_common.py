@@ -0,0 +1,184 @@
+"""
+Helpers shared by the example scripts.
+
+The scripts expose a `build_inputs` function returning a (process class, inputs)
+tuple. The submission of one or several of these tuples is managed here, so that
+they all go through the same loaded profile and connection to the daemon.
+"""
+import argparse
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
+from aiida_siesta.utils.fdf_blocks import fdf_block
+
+
+#
+# Command line of the example scripts: --send|--dont-send [codename]
+#
+CLI = argparse.ArgumentParser(description="Submit the example (--send) or only run a dry-run test (--dont-send)")
+_MODE = CLI.add_mutually_exclusive_group(required=True)
+_MODE.add_argument('--send', dest='submit_test', action='store_false', help="submit the calculation")
+_MODE.add_argument(
+    '--dont-send', dest='submit_test', action='store_true', help="only create the inputs in the submit_test folder"
+)
+CLI.add_argument('codename', nargs='?', default='Siesta4.0.1@kelvin', help="the Siesta code (default: %(default)s)")
+
+
+def bulk_submit(specs, submit_test=False):
+    """
+    Submit a list of processes one after the other.
+
+    :param specs: a list of (process class, inputs dictionary) tuples
+    :param submit_test: if True, the processes are run as dry-runs, that
+        only create the input files in the `submit_test` folder. Dry-runs are
+        run in this same interpreter, without going through the daemon, and
+        the provenance graph is not stored.
+    :return: the list of the submitted (or dry-run) process nodes
+    """
+    from aiida.engine import submit, run_get_node
+
+    processes = []
+    for process_class, inputs in specs:
+        if submit_test:
+            inputs["metadata"]["dry_run"] = True
+            inputs["metadata"]["store_provenance"] = False
+            _, process = run_get_node(process_class, **inputs)
+            print("Submited test for calculation (uuid='{}')".format(process.uuid))
+            print("Check the folder submit_test for the result of the test")
+        else:
+            process = submit(process_class, **inputs)
+            print("Submitted calculation; ID={}".format(process.pk))
+            print("For information about this calculation type: verdi process show {}".format(process.pk))
+            print("For a list of running processes type: verdi process list")
+        processes.append(process)
+
+    return processes
+
+
+#
+# Coarse parameters (for speed of test) shared by all the NEB examples.
+# The templates are read-only, the Dict nodes are built from copies.
+#
+COARSE_NEB_PARAMS = MappingProxyType({
+    "mesh-cutoff": "50 Ry",
+    "dm-tolerance": "0.001",
+    "DM-NumberPulay ": "3",
+    "DM-History-Depth": "0",
+    "SCF-Mixer-weight": "0.02",
+    "SCF-Mix": "density",
+    "SCF-Mixer-kick": "35",
+    "MD-VariableCell": "F",
+    "MD-MaxCGDispl": "0.3 Bohr",
+    "MD-MaxForceTol": " 0.04000 eV/Ang"
+})
+
+
+def make_parameters(*blocks, **overrides):
+    """
+    Build the parameters Dict of a NEB example from `COARSE_NEB_PARAMS`.
+
+    :param blocks: mappings (typically with %block entries) added to the template
+    :param overrides: changes to single options. Underscores in the names stand
+        for hyphens, and an option already in the template is replaced whatever
+        its spelling, e.g. `dm_tolerance="0.0001"` replaces "dm-tolerance".
+    :return: an unstored Dict
+    """
+    from aiida.orm import Dict
+    from aiida_siesta.calculations.tkdict import FDFDict
+
+    params = dict(COARSE_NEB_PARAMS)
+    spelling = {FDFDict.translate_key(key.strip()): key for key in params}
+
+    def _set(key, value):
+        fdf_key = FDFDict.translate_key(key.strip())
+        params[spelling.setdefault(fdf_key, key)] = value
+
+    for block in blocks:
+        for key, value in block.items():
+            _set(key, value)
+    for key, value in overrides.items():
+        _set(key.replace("_", "-"), value)
+
+    return Dict(dict=params)
+
+
+#
+# Inputs shared by the examples of an H interstitial in a Si8 host.
+#
+
+# Fractional coordinates of the atoms of the Si8 cubic cell
+SI8_FRAC = np.array([[0.00, 0.00, 0.00],
+                     [0.50, 0.50, 0.00],
+                     [0.50, 0.00, 0.50],
+                     [0.00, 0.50, 0.50],
+                     [0.25, 0.25, 0.25],
+                     [0.75, 0.75, 0.25],
+                     [0.75, 0.25, 0.75],
+                     [0.25, 0.75, 0.75]])
+SI8_FRAC.setflags(write=False)
+
+
+@lru_cache()
+def _si8_template(alat):
+    """
+    The Si8 host for a given lattice parameter, built once per session.
+    It is never handed out, only cloned, so it always stays unstored.
+    """
+    from aiida_siesta.utils.structures import structure_from_arrays
+
+    return structure_from_arrays(alat * np.eye(3), alat * SI8_FRAC, ['Si'] * len(SI8_FRAC))
+
+
+def make_si8(alat):
+    """
+    The Si8 cubic cell, used as host.
+
+    :param alat: the lattice parameter, in Angstrom
+    :return: an unstored StructureData, ready to get more atoms appended
+    """
+    from aiida_siesta.utils.structures import clone_aiida_structure
+
+    return clone_aiida_structure(_si8_template(alat))
+
+
+# Note the all the Si atoms are fixed...
+SI_H_CONSTRAINTS = fdf_block("Geometry-Constraints", "atom [ 1 -- 8 ]")
+
+SI_H_BASIS = MappingProxyType({
+    'pao-energy-shift': '300 meV',
+    **fdf_block("pao-basis-sizes", """
+    Si SZ
+    H SZ
+    """),
+})
+
+SI_H_OPTIONS = {
+    "max_wallclock_seconds": 3600,
+    'withmpi': True,
+    "resources": {
+        "num_machines": 1,
+        "num_mpiprocs_per_machine": 2,
+    }
+}
+
+
+@lru_cache()
+def coarse_neb_parameters():
+    """
+    The Dict with the coarse parameters and the constraints of the Si-H examples.
+    The same node is returned at every call, so that it is stored only once
+    when used by several examples. Clone it if a fresh unstored node is needed.
+    """
+    return make_parameters(SI_H_CONSTRAINTS)
+
+
+@lru_cache()
+def si_h_basis():
+    """
+    The Dict with the basis of the Si-H examples, shared like `coarse_neb_parameters`.
+    """
+    from aiida.orm import Dict
+
+    return Dict(dict=dict(SI_H_BASIS))
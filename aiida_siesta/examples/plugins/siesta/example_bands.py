@@ -14,7 +14,7 @@ from aiida.engine import submit
 from aiida.orm import load_code
 from aiida.orm import (Dict, StructureData, KpointsData)
 from aiida_siesta.calculations.siesta import SiestaCalculation
-from aiida_siesta.data.psf import PsfData
+from aiida_siesta.utils.pseudos import cached_psf
 from aiida.tools import get_explicit_kpoints_path
 
 
@@ -134,11 +134,7 @@ raw_pseudos = [("Si.psf", ['Si'])]
 for fname, kinds in raw_pseudos:
     absname = op.realpath(
         op.join(op.dirname(__file__), "data/sample-psf-family", fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("\nCreated the pseudo for {}".format(kinds))
-    else:
-        print("\nUsing the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
+    pseudo = cached_psf(absname)
     for j in kinds:
         pseudos_dict[j]=pseudo
 
@@ -9,7 +9,7 @@ from aiida.engine import submit
 from aiida.orm import load_code
 from aiida.orm import (Dict, StructureData, KpointsData)
 from aiida_siesta.calculations.siesta import SiestaCalculation
-from aiida_siesta.data.psf import PsfData
+from aiida_siesta.utils.pseudos import cached_psf
 
 ##In alternative, Data and Calculation factories could be loaded.
 ##They containing all the data and calculation plugins:
@@ -87,7 +87,7 @@ parameters = Dict(
 #The basis set
 
 basis = Dict(dict={
-    'floating_orbitals': [ ('Si_bond', 'Si', ( 0.125*alat, 0.125*alat, 0.125*alat) ) ],
+    'floating_orbitals': [ ['Si_bond', 'Si', [ 0.125*alat, 0.125*alat, 0.125*alat] ] ],
 'pao-energy-shift': '300 meV',
 '%block pao-basis-sizes': """
 Si_one SZP
@@ -105,11 +105,7 @@ raw_pseudos = [("Si.psf", ['Si_one','Si_two','Si_bond'])]
 for fname, kinds in raw_pseudos:
     absname = op.realpath(
         op.join(op.dirname(__file__), "data/sample-psf-family", fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("\nCreated the pseudo for {}".format(kinds))
-    else:
-        print("\nUsing the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
+    pseudo = cached_psf(absname)
     for j in kinds:
         pseudos_dict[j]=pseudo
 
@@ -7,6 +7,7 @@ from aiida.engine import submit
 from aiida.orm import load_code
 from aiida_siesta.calculations.siesta import SiestaCalculation
 from aiida.plugins import DataFactory
+from aiida_siesta.utils.pseudos import cached_psf
 
 # There is no parsing for the ldos, but the file .LDOS can be
 # retrieved using the "settings" feature (see below).
@@ -150,11 +151,7 @@ for fname, kinds, in raw_pseudos:
     absname = os.path.realpath(
         os.path.join(os.path.dirname(__file__), "data/sample-psf-family",
                      fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("Created the pseudo for {}".format(kinds))
-    else:
-        print("Using the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
+    pseudo = cached_psf(absname)
     for j in kinds:
         pseudos_dict[j]=pseudo
 
@@ -7,6 +7,7 @@ from aiida.orm import load_code
 from aiida_siesta.calculations.siesta import SiestaCalculation
 from aiida.plugins import DataFactory
 from aiida.tools import get_explicit_kpoints_path
+from aiida_siesta.utils.pseudos import cached_psf
 
 # Calculation on Iron, collinear spin polarization applied
 
@@ -122,11 +123,7 @@ for fname, kinds, in raw_pseudos:
     absname = os.path.realpath(
         os.path.join(os.path.dirname(__file__), "data/sample-psf-family",
                      fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("Created the pseudo for {}".format(kinds))
-    else:
-        print("Using the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
+    pseudo = cached_psf(absname)
     for j in kinds:
         pseudos_dict[j]=pseudo
 
@@ -2,178 +2,112 @@
 
 #Not required by AiiDA
 import os.path as op
-import sys
 
 #AiiDA classes and functions
-from aiida.engine import submit
 from aiida.orm import load_code
-from aiida.orm import (Dict, StructureData, KpointsData)
-from aiida.orm import TrajectoryData, SinglefileData
+from aiida.orm import KpointsData
 from aiida_siesta.calculations.siesta import SiestaCalculation
-from aiida_siesta.utils.interpol import interpolate_two_structures_ase
+from aiida_siesta.examples._common import CLI, bulk_submit, make_si8, coarse_neb_parameters, si_h_basis, SI_H_OPTIONS
+from aiida_siesta.utils.interpol import interpolate_two_structures_positions, path_trajectory
 from aiida_siesta.utils.structures import clone_aiida_structure
 
 
-from aiida_siesta.data.psf import PsfData
-
-try:
-    dontsend = sys.argv[1]
-    if dontsend == "--dont-send":
-        submit_test = True
-    elif dontsend == "--send":
-        submit_test = False
-    else:
-        raise IndexError
-except IndexError:
-    print(("The first parameter can only be either "
-           "--send or --dont-send"),
-          file=sys.stderr)
-    sys.exit(1)
-
-try:
-    codename = sys.argv[2]
-except IndexError:
-    codename = 'Siesta4.0.1@kelvin'
-
-#The code
-code = load_code(codename)
-
-# Si8 cubic cell as host
-alat = 5.430
-cell = [[1.0*alat, 0.0 , 0.0,],
-        [0.0, 1.0*alat , 0.0,],
-        [0.0, 0.0 , 1.0*alat,],
-        ]
-
-s = StructureData(cell=cell)
-s.append_atom(position=(   alat*0.000, alat*0.000, alat*0.000),symbols='Si')
-s.append_atom(position=(   alat*0.500, alat*0.500, alat*0.000),symbols='Si')
-s.append_atom(position=(   alat*0.500, alat*0.000, alat*0.500),symbols='Si')
-s.append_atom(position=(   alat*0.000, alat*0.500, alat*0.500),symbols='Si')
-s.append_atom(position=(   alat*0.250, alat*0.250, alat*0.250),symbols='Si')
-s.append_atom(position=(   alat*0.750, alat*0.750, alat*0.250),symbols='Si')
-s.append_atom(position=(   alat*0.750, alat*0.250, alat*0.750),symbols='Si')
-s.append_atom(position=(   alat*0.250, alat*0.750, alat*0.750),symbols='Si')
-
-host = s
-
-# Initial: H interstitial
-s_initial = clone_aiida_structure(host)
-s_initial.append_atom(position=(   alat*0.000, alat*0.250, alat*0.250),symbols='H')
-
-# Final: H interstitial in a site related by symmetry
-s_final = clone_aiida_structure(host)
-s_final.append_atom(position=(   alat*0.250, alat*0.250, alat*0.000),symbols='H')
-
-image_structure_list = interpolate_two_structures_ase(s_initial, s_final, n_images=5)
-images = TrajectoryData(image_structure_list)
-
-# Lua script
-absname = op.abspath(
-        op.join(op.dirname(__file__), "data/neb-data/neb_with_restart-new.lua"))
-lua_script = SinglefileData(absname)
-
-
-# Parameters: very coarse for speed of test
-# Note the all the Si atoms are fixed...
-
-parameters = dict={
-   "mesh-cutoff": "50 Ry",
-   "dm-tolerance": "0.001",
-   "DM-NumberPulay ":  "3",
-   "DM-History-Depth":  "0",
-   "SCF-Mixer-weight":  "0.02",
-   "SCF-Mix":   "density",
-   "SCF-Mixer-kick":  "35",
-   "MD-VariableCell":  "F",
-   "MD-MaxCGDispl":  "0.3 Bohr",
-   "MD-MaxForceTol":  " 0.04000 eV/Ang"
-    }
+from aiida_siesta.utils.files import get_or_create_singlefile_from_bytes
+from aiida_siesta.utils.pseudos import cached_psf
+
+#Location of the data files
+PSF_DIR = op.realpath(op.join(op.dirname(__file__), "data/sample-psf-family"))
+LUA_SCRIPT_PATH = op.abspath(op.join(op.dirname(__file__), "data/neb-data/neb_with_restart-new.lua"))
+with open(LUA_SCRIPT_PATH, 'rb') as _handle:
+    _LUA_BYTES = _handle.read()
 
-constraints = dict={
-    "%block Geometry-Constraints":
+
+def build_inputs(code, submit_test=False):
     """
-    atom [ 1 -- 8 ]
-    %endblock Geometry-Constraints"""
-    }
+    Inputs of a NEB calculation for the migration of an H interstitial in Si.
 
-#
-# Use this for constraints
-#
-parameters.update(constraints)
-#
-parameters = Dict(dict=parameters)
-
-    
-#The basis set
-basis = Dict(dict={
-'pao-energy-shift': '300 meV',
-'%block pao-basis-sizes': """
-Si SZ
-H SZ
-%endblock pao-basis-sizes""",
-    })
-
-
-#The kpoints
-#kpoints = KpointsData()
-#kpoints.set_kpoints_mesh([2, 2, 2])
-
-#The pseudopotentials
-pseudos_dict = {}
-raw_pseudos = [("Si.psf", ['Si']), ("H.psf", ['H'])]
-for fname, kinds in raw_pseudos:
-    absname = op.realpath(
-        op.join(op.dirname(__file__), "data/sample-psf-family", fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("\nCreated the pseudo for {}".format(kinds))
-    else:
-        print("\nUsing the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
-    for j in kinds:
-        pseudos_dict[j]=pseudo
-
-#Resources
-options = {
-    "max_wallclock_seconds": 3600,
-    'withmpi': True,
-    "resources": {
-        "num_machines": 1,
-        "num_mpiprocs_per_machine": 2,
-    }
-}
-
-
-#The submission
-#All the inputs of a Siesta calculations are listed in a dictionary
-inputs = {
-    'structure': s_initial,
-    'parameters': parameters,
-    'code': code,
-    'basis': basis,
-    'lua_script': lua_script,
-#    'kpoints': kpoints,
-    'neb_input_images': images,
-    'pseudos': pseudos_dict,
-    'metadata': {
-        "label": "H interstitial migration in Si",
-        'options': options,
+    :param code: the Siesta code
+    :param submit_test: if True, the inputs are meant for a dry-run and the
+        pseudos and the Lua script are not stored
+    :return: a (process class, inputs) tuple
+    """
+
+    # Si8 cubic cell as host
+    alat = 5.430
+    host = make_si8(alat)
+
+    # Initial: H interstitial
+    s_initial = clone_aiida_structure(host)
+    s_initial.append_atom(position=(   alat*0.000, alat*0.250, alat*0.250),symbols='H')
+
+    # Final: H interstitial in a site related by symmetry
+    s_final = clone_aiida_structure(host)
+    s_final.append_atom(position=(   alat*0.250, alat*0.250, alat*0.000),symbols='H')
+
+    # The images are built directly from the stacked positions of the path,
+    # without going through a StructureData per image
+    frames = interpolate_two_structures_positions(s_initial, s_final, 5, method="idpp")
+    images = path_trajectory(s_initial, s_final, frames)
+
+    # Lua script
+    lua_script = get_or_create_singlefile_from_bytes(_LUA_BYTES, op.basename(LUA_SCRIPT_PATH), store=not submit_test)
+
+
+    # Parameters: very coarse for speed of test
+    # Note the all the Si atoms are fixed...
+    parameters = coarse_neb_parameters()
+
+    #The basis set
+    basis = si_h_basis()
+
+
+    #The kpoints
+    #kpoints = KpointsData()
+    #kpoints.set_kpoints_mesh([2, 2, 2])
+
+    #The pseudopotentials
+    pseudos_dict = {}
+    raw_pseudos = [("Si.psf", ['Si']), ("H.psf", ['H'])]
+    for fname, kinds in raw_pseudos:
+        absname = op.join(PSF_DIR, fname)
+        pseudo = cached_psf(absname, store=not submit_test)
+        for j in kinds:
+            pseudos_dict[j]=pseudo
+
+    #Resources
+    options = SI_H_OPTIONS
+
+
+    #All the inputs of a Siesta calculations are listed in a dictionary
+    inputs = {
+        'structure': s_initial,
+        'parameters': parameters,
+        'code': code,
+        'basis': basis,
+        'lua_script': lua_script,
+    #    'kpoints': kpoints,
+        'neb_input_images': images,
+        'pseudos': pseudos_dict,
+        'metadata': {
+            "label": "H interstitial migration in Si",
+            'options': options,
+        }
     }
-}
-
-if submit_test:
-    inputs["metadata"]["dry_run"] = True
-    inputs["metadata"]["store_provenance"] = False
-    process = submit(SiestaCalculation, **inputs)
-    print("Submited test for calculation (uuid='{}')".format(process.uuid))
-    print("Check the folder submit_test for the result of the test")
-
-else:
-    process = submit(SiestaCalculation, **inputs)
-    print("Submitted calculation; ID={}".format(process.pk))
-    print("For information about this calculation type: verdi process show {}".
-          format(process.pk))
-    print("For a list of running processes type: verdi process list")
+
+    return SiestaCalculation, inputs
+
+
+if __name__ == "__main__":
+
+    args = CLI.parse_args()
+    submit_test = args.submit_test
+    codename = args.codename
+
+    #The code
+    code = load_code(codename)
+
+    #The submission
+    bulk_submit([build_inputs(code, submit_test)], submit_test)
 
 ##An alternative is be to use the builder
 #build=SiestaCalculation.get_builder()
@@ -183,5 +117,3 @@ else:
 #...
 #build.metadata.options.resources = {'num_machines': 1 "num_mpiprocs_per_machine": 1}
 #process = submit(builder)
-
-
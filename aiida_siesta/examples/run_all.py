@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Run several examples from a single interpreter.
+
+The AiiDA profile is loaded only once, then the `build_inputs` function of
+each example is called and all the resulting processes are submitted
+together through `bulk_submit`. The examples can still be run one by one,
+as scripts, with `runaiida`.
+
+Usage: python run_all.py --send|--dont-send [codename]
+"""
+import importlib.util
+import os.path as op
+
+# Examples exposing `build_inputs(code, submit_test)`, relative to this folder
+EXAMPLES = [
+    "plugins/siesta/example_neb.py",
+    "plugins/siesta/example_neb_H2-H.py",
+    "plugins/siesta/example_neb_SiH.py",
+    "plugins/siesta/example_neb_ghost.py",
+]
+
+
+def load_example(relative_path):
+    """
+    Import an example script as a module. Its `__main__` block is not executed.
+
+    :param relative_path: the path of the script, relative to this folder
+    :return: the module
+    """
+    path = op.join(op.dirname(op.abspath(__file__)), relative_path)
+    # Some file names are not valid module names (e.g. example_neb_H2-H.py)
+    name = op.splitext(op.basename(path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+if __name__ == "__main__":
+
+    from aiida_siesta.examples._common import CLI, bulk_submit
+
+    args = CLI.parse_args()
+    submit_test = args.submit_test
+    codename = args.codename
+
+    from aiida import load_profile
+    load_profile()
+
+    from aiida.orm import load_code
+
+    #The code
+    code = load_code(codename)
+
+    #The submission
+    specs = [load_example(example).build_inputs(code, submit_test) for example in EXAMPLES]
+    bulk_submit(specs, submit_test)
@@ -55,7 +55,7 @@ lua_script = SinglefileData(absname)
 # Parameters: very coarse for speed of test
 # Note the all the Si atoms are fixed...
 
-parameters = dict={
+parameters = {
    "mesh-cutoff": "50 Ry",
    "dm-tolerance": "0.001",
    "DM-NumberPulay ":  "3",
@@ -68,26 +68,23 @@ parameters = dict={
    "MD-MaxForceTol":  " 0.04000 eV/Ang"
     }
 
-constraints = dict={
+constraints = {
     "%block Geometry-Constraints":
     """
     atom [ 1 -- 8 ]
     %endblock Geometry-Constraints"""
     }
 
-relaxation = dict={
+relaxation = {
     'md-steps': 10
     }
 
 #
 # Use this for constraints
 #
-parameters.update(constraints)
-#
-neb_parameters = Dict(dict=parameters)
+neb_parameters = Dict(dict={**parameters, **constraints})
 
-parameters.update(relaxation)
-endpoint_parameters = Dict(dict=parameters)
+endpoint_parameters = Dict(dict={**parameters, **constraints, **relaxation})
 
     
 #The basis set
@@ -7,14 +7,21 @@ import sys
 #AiiDA classes and functions
 from aiida.engine import submit
 from aiida.orm import load_code
-from aiida.orm import (Dict, StructureData, KpointsData)
-from aiida.orm import SinglefileData
+from aiida.orm import (Dict, Int, KpointsData)
 
-from aiida_siesta.data.psf import PsfData
+from aiida_siesta.utils.files import get_or_create_singlefile_from_bytes
+from aiida_siesta.utils.pseudos import cached_psf
 from aiida_siesta.workflows.neb import NEBWorkChain
+from aiida_siesta.examples._common import make_si8, COARSE_NEB_PARAMS, SI_H_CONSTRAINTS, SI_H_OPTIONS, si_h_basis
 
 from aiida_siesta.utils.structures import clone_aiida_structure
 
+#Location of the data files
+PSF_DIR = op.realpath(op.join(op.dirname(__file__), "../plugins/siesta/data/sample-psf-family"))
+LUA_SCRIPT_PATH = op.abspath(op.join(op.dirname(__file__), "../plugins/siesta/data/neb-data/neb_with_restart-new.lua"))
+with open(LUA_SCRIPT_PATH, 'rb') as _handle:
+    _LUA_BYTES = _handle.read()
+
 try:
     codename = sys.argv[1]
 except IndexError:
@@ -24,22 +31,7 @@ code = load_code(codename)
 
 # Si8 cubic cell as host
 alat = 5.430
-cell = [[1.0*alat, 0.0 , 0.0,],
-        [0.0, 1.0*alat , 0.0,],
-        [0.0, 0.0 , 1.0*alat,],
-        ]
-
-s = StructureData(cell=cell)
-s.append_atom(position=(   alat*0.000, alat*0.000, alat*0.000),symbols='Si')
-s.append_atom(position=(   alat*0.500, alat*0.500, alat*0.000),symbols='Si')
-s.append_atom(position=(   alat*0.500, alat*0.000, alat*0.500),symbols='Si')
-s.append_atom(position=(   alat*0.000, alat*0.500, alat*0.500),symbols='Si')
-s.append_atom(position=(   alat*0.250, alat*0.250, alat*0.250),symbols='Si')
-s.append_atom(position=(   alat*0.750, alat*0.750, alat*0.250),symbols='Si')
-s.append_atom(position=(   alat*0.750, alat*0.250, alat*0.750),symbols='Si')
-s.append_atom(position=(   alat*0.250, alat*0.750, alat*0.750),symbols='Si')
-
-host = s
+host = make_si8(alat)
 
 # Initial: H interstitial
 s_initial = clone_aiida_structure(host)
@@ -51,58 +43,25 @@ s_final.append_atom(position=(   alat*0.250, alat*0.250, alat*0.000),symbols='H'
 
 
 # Lua script
-absname = op.abspath(
-        op.join(op.dirname(__file__), "../plugins/siesta/data/neb-data/neb_with_restart-new.lua"))
 n_images_in_script=5
-lua_script = SinglefileData(absname)
+lua_script = get_or_create_singlefile_from_bytes(_LUA_BYTES, op.basename(LUA_SCRIPT_PATH))
 
 
 # Parameters: very coarse for speed of test
 # Note the all the Si atoms are fixed...
+parameters = {**COARSE_NEB_PARAMS, **SI_H_CONSTRAINTS, "MD-MaxForceTol": " 0.06000 eV/Ang"}
 
-parameters = dict={
-   "mesh-cutoff": "50 Ry",
-   "dm-tolerance": "0.001",
-   "DM-NumberPulay ":  "3",
-   "DM-History-Depth":  "0",
-   "SCF-Mixer-weight":  "0.02",
-   "SCF-Mix":   "density",
-   "SCF-Mixer-kick":  "35",
-   "MD-VariableCell":  "F",
-   "MD-MaxCGDispl":  "0.3 Bohr",
-   "MD-MaxForceTol":  " 0.06000 eV/Ang"
-    }
-
-constraints = dict={
-    "%block Geometry-Constraints":
-    """
-    atom [ 1 -- 8 ]
-    %endblock Geometry-Constraints"""
-    }
-
-relaxation = dict={
+relaxation = {
     'md-steps': 10
     }
 
-#
-# Use this for constraints
-#
-parameters.update(constraints)
-#
 neb_parameters = Dict(dict=parameters)
 
-parameters.update(relaxation)
-endpoint_parameters = Dict(dict=parameters)
+endpoint_parameters = Dict(dict={**parameters, **relaxation})
+
 
-    
 #The basis set
-basis = Dict(dict={
-'pao-energy-shift': '300 meV',
-'%block pao-basis-sizes': """
-Si SZ
-H SZ
-%endblock pao-basis-sizes""",
-    })
+basis = si_h_basis()
 
 
 #The kpoints
@@ -116,25 +75,13 @@ kpoints_neb.set_kpoints_mesh([1,1,1])
 pseudos_dict = {}
 raw_pseudos = [("Si.psf", ['Si']), ("H.psf", ['H'])]
 for fname, kinds in raw_pseudos:
-    absname = op.realpath(
-        op.join(op.dirname(__file__), "../plugins/siesta/data/sample-psf-family", fname))
-    pseudo, created = PsfData.get_or_create(absname, use_first=True)
-    if created:
-        print("Created the pseudo for {}".format(kinds))
-    else:
-        print("Using the pseudo for {} from DB: {}".format(kinds, pseudo.pk))
+    absname = op.join(PSF_DIR, fname)
+    pseudo = cached_psf(absname)
     for j in kinds:
         pseudos_dict[j]=pseudo
 
 #Resources
-options = {
-    "max_wallclock_seconds": 3600,
-    'withmpi': True,
-    "resources": {
-        "num_machines": 1,
-        "num_mpiprocs_per_machine": 2,
-    }
-}
+options = SI_H_OPTIONS
 
 #
 # For finer-grained compatibility with script
@@ -142,12 +89,7 @@ options = {
 options_neb = {
     'neb_results_file': 'NEB.results',
     'neb_xyz_prefix': 'image_',
-    "max_wallclock_seconds": 3600,
-    'withmpi': True,
-    "resources": {
-        "num_machines": 1,
-        "num_mpiprocs_per_machine": 2,
-    }
+    **SI_H_OPTIONS
 }
 
 
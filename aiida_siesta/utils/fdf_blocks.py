@@ -0,0 +1,22 @@
+#
+# Helpers for the fdf blocks of the input dictionaries
+#
+from functools import lru_cache
+from textwrap import dedent
+from types import MappingProxyType
+
+
+@lru_cache(maxsize=None)
+def fdf_block(name, body):
+    """
+    The entry of a parameters (or basis) dictionary for the fdf block `name`,
+    with its content normalized: common indentation and surrounding blank
+    lines are removed, so that the same block always gives the same string
+    (and therefore the same hash of the Dict node).
+
+    :param name: the name of the block, e.g. "Geometry-Constraints"
+    :param body: the content of the block
+    :return: a read-only single-item mapping {"%block name": "\\n<body>\\n%endblock name"},
+        to be merged in the dictionary
+    """
+    return MappingProxyType({f"%block {name}": f"\n{dedent(body).strip()}\n%endblock {name}"})
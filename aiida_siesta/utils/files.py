@@ -0,0 +1,64 @@
+#
+# Helpers for the handling of file nodes
+#
+_SHA256_EXTRA = '_content_sha256'
+
+
+def get_or_create_singlefile(abs_path, store=True):
+    """
+    Get the stored SinglefileData node holding the content of a file, or
+    create (and store) one if it does not exist yet. The nodes are identified
+    by their file name and the sha256 of their content, saved in the extras,
+    so that the same file is uploaded only once, however many times it is used.
+
+    :param abs_path: the absolute path of the file
+    :param store: if False, the database is not touched at all and a new unstored
+        SinglefileData is returned. Meant for dry-runs, where nothing is stored.
+    :return: a SinglefileData instance
+    """
+    import os
+
+    if not os.path.isabs(abs_path):
+        raise ValueError("abs_path must be an absolute path")
+
+    with open(abs_path, 'rb') as handle:
+        content = handle.read()
+
+    return get_or_create_singlefile_from_bytes(content, os.path.basename(abs_path), store=store)
+
+
+def get_or_create_singlefile_from_bytes(content, filename, store=True):
+    """
+    Same as `get_or_create_singlefile`, for a content already in memory
+    (for instance, read once when a script is loaded).
+
+    :param content: the content of the file, as bytes
+    :param filename: the name of the file in the SinglefileData
+    :param store: if False, the database is not touched at all and a new unstored
+        SinglefileData is returned. Meant for dry-runs, where nothing is stored.
+    :return: a SinglefileData instance
+    """
+    import hashlib
+    import io
+    from aiida.orm import QueryBuilder, SinglefileData
+
+    if not store:
+        return SinglefileData(io.BytesIO(content), filename=filename)
+
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    qb = QueryBuilder()
+    qb.append(SinglefileData, filters={
+        'extras.{}'.format(_SHA256_EXTRA): content_hash,
+        'attributes.filename': filename,
+    })
+    existing = qb.first()
+    if existing is not None:
+        return existing[0]
+
+    # The extra is stored together with the node, so that it is always found later
+    node = SinglefileData(io.BytesIO(content), filename=filename)
+    node.set_extra(_SHA256_EXTRA, content_hash)
+    node.store()
+
+    return node
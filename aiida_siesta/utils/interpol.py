@@ -1,27 +1,144 @@
 #
 # Module 
 #
+from aiida.engine import calcfunction
 from aiida_siesta.utils.structures import aiida_struct_to_ase
 from aiida_siesta.utils.structures import ase_struct_to_aiida
+from aiida_siesta.utils.structures import get_kinds_raw
+
+# The methods understood by _interpolate_arrays
+INTERPOLATION_METHODS = ('idpp', 'linear')
 #
-def interpolate_two_structures(s1, s2, n_images):
+def interpolate_two_structures_positions(s1, s2, n_images, method="linear", s_mid=None):
     """
-    Interpolate linearly the coordinates of two structures.
+    Interpolate the coordinates of two structures, linearly by default.
     Assume StructureData objects s1 and s2 are commensurate.
     :param: n_images is the number of internal points ("images") 
             over which to interpolate
+    :param: method: the interpolation method (see _interpolate_arrays)
+    :param: s_mid: if present, a structure (commensurate with s1 and s2)
+            used as the central image of the path. n_images must be odd
 
-    :return: a list of structures
+    :return: a (n_images+2, n_atoms, 3) array with the positions of all
+             the points of the path, end points included
     """
 
     import numpy as np
     p1 =  np.array([ site.position for site in s1.sites])
     p2 =  np.array([ site.position for site in s2.sites])
+    pm = None if s_mid is None else np.array([site.position for site in s_mid.sites])
+
+    return _interpolate_arrays(p1, p2, s1.cell, s1.pbc, n_images, method=method, waypoint=pm)
+
+def path_trajectory(s1, s2, frames, kinds_raw=None):
+    """
+    The TrajectoryData of a path between two structures, from the array
+    of the positions of all its points, annotated with the 'serializable'
+    kinds of s1. As with ASE, all the points but the last one take the cell of s1.
+    :param: s1, s2  The end-point structures
+    :param: frames  A (n_steps, n_atoms, 3) array with the positions of all
+            the points of the path, end points included
+    :param: kinds_raw  The 'serializable' kinds, if already at hand
+            (by default they are obtained from s1)
+    """
+
+    from aiida_siesta.utils.trajectory import trajectory_from_positions_array
+
+    cells = [s1.cell] * (len(frames) - 1) + [s2.cell]
+    path = trajectory_from_positions_array(cells, frames, [site.kind_name for site in s1.sites])
+    path.set_attribute('kinds', get_kinds_raw(s1) if kinds_raw is None else kinds_raw)
+
+    return path
+
+def _interpolate_arrays(p1, p2, cell, pbc, n_images, method="linear", waypoint=None):
+    """
+    Interpolate the positions of two commensurate configurations.
+    :param: p1, p2  (n_atoms, 3) arrays with the cartesian positions of the end points
+    :param: cell, pbc  The cell and periodicity, common to both end points
+    :param: n_images is the number of internal points ("images")
+            over which to interpolate
+    :param: method: "linear", done with numpy, or "idpp", for which the
+            linear path is further optimized by the ASE NEB pre-optimizer.
+            Any other method raises a ValueError
+    :param: waypoint: if present, a (n_atoms, 3) array with the positions of
+            the central image (n_images must then be odd). The path is seeded
+            linearly through it, and optimized as a whole
+
+    :return: a (n_images+2, n_atoms, 3) array with the positions of all
+             the points of the path, end points included
+    """
+
+    import numpy as np
+
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method '{method}', not one of {', '.join(INTERPOLATION_METHODS)}")
+
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+
+    # All the frames at once
+    if waypoint is None:
+        weights = np.linspace(0.0, 1.0, n_images + 2)
+        frames = p1[None] + weights[:, None, None] * (p2 - p1)[None]
+    else:
+        if n_images % 2 == 0:
+            raise ValueError("The number of images must be odd for the path to go through a waypoint")
+        pm = np.asarray(waypoint, dtype=np.float64)
+        weights = np.linspace(0.0, 1.0, n_images // 2 + 2)
+        first = p1[None] + weights[:, None, None] * (pm - p1)[None]
+        second = pm[None] + weights[:, None, None] * (p2 - pm)[None]
+        # The central point is shared by both sections
+        frames = np.concatenate((first[:-1], second))
+
+    if method == "idpp":
+        # The pre-optimizer only needs positions and cell: the species are irrelevant
+        import ase
+        from ase.neb import NEB
+
+        images = [ase.Atoms(positions=frame, cell=cell, pbc=pbc) for frame in frames]
+        NEB(images).idpp_interpolate(traj=None, log=None)
+        frames = np.array([image.positions for image in images])
+
+    # The end points are kept exactly as they are
+    frames[0] = p1
+    frames[-1] = p2
+
+    return frames
+
+@calcfunction
+def interpolate_path(initial, final, n_images, method):
+    """
+    Calcfunction generating the starting path of a NEB calculation by
+    interpolation of two end-point structures, annotated with the
+    'serializable' kinds of the initial one and the method used.
+    :param: initial, final  The end-point structures (commensurate)
+    :param: n_images  An Int with the number of internal images
+    :param: method  A Str with the interpolation method (see _interpolate_arrays)
+
+    :return: a TrajectoryData with the n_images+2 points of the path
+    """
+
+    frames = interpolate_two_structures_positions(initial, final, n_images.value, method=method.value)
+
+    path = path_trajectory(initial, final, frames)
+    path.set_attribute('interpolation_method', method.value)
+
+    return path
+
+def interpolate_two_structures(s1, s2, n_images):
+    """
+    Interpolate linearly the coordinates of two structures.
+    Assume StructureData objects s1 and s2 are commensurate.
+    :param: n_images is the number of internal points ("images") 
+            over which to interpolate
+
+    :return: a list of structures
+    """
+
+    frames = interpolate_two_structures_positions(s1, s2, n_images)
 
     structure_list = [s1]
-    delta = (p2-p1)/(n_images + 1)
-    for i in range(n_images):
-        pi = p1 + (i+1)*delta
+    for pi in frames[1:-1]:
         # Note that this is a simple clone.
         # No more atoms can be added to this structure
         # Be on guard for possible issues with 'ghost' atoms later
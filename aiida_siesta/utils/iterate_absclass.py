@@ -734,6 +734,9 @@ class BaseIterator(WorkChain):
         Takes care of handling a batch of simulations. The numeber of processes for
         each batch is decided by the user through the input port `batch_size`.
         For each item in the batch, it calls `_run_process`.
+        All the processes of the batch are submitted in this same step, without waiting
+        for each other, and they run concurrently. The workchain only waits (through
+        `ToContext`) for the batch as a whole.
         '''
 
         self.ctx.last_step_processes = []
@@ -0,0 +1,37 @@
+#
+# Helpers for the handling of pseudopotential files
+#
+import os
+from functools import lru_cache
+
+
+def cached_psf(abs_path, store=True):
+    """
+    Get (or create) the PsfData node of a psf file, remembering it for
+    the rest of the session. Since PsfData is identified by the md5 of its
+    content, repeated lookups of the same file return the same node, and
+    neither the file hashing nor the query to the database need to be redone.
+    The cache is keyed also by the modification time and size of the file,
+    so that a file changed on disk is looked up again.
+
+    :param abs_path: the absolute path of the psf file
+    :param store: if False, the database is not touched at all and an unstored
+        PsfData is returned. Meant for dry-runs, where nothing is stored.
+    :return: a PsfData instance
+    """
+    stat = os.stat(abs_path)
+
+    return _cached_get_or_create(abs_path, stat.st_mtime_ns, stat.st_size, store)
+
+
+@lru_cache(maxsize=None)
+def _cached_get_or_create(abs_path, mtime, size, store):  # pylint: disable=unused-argument
+    """
+    Cached worker of `cached_psf`. The mtime and size are only part of the key.
+    """
+    from aiida_siesta.data.psf import PsfData
+
+    if not store:
+        return PsfData(file=abs_path)
+
+    return PsfData.get_or_create(abs_path, use_first=True)[0]
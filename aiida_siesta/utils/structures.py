@@ -1,6 +1,23 @@
 #
 #
 #
+import math
+
+import ase
+import numpy as np
+from aiida.orm import StructureData
+from aiida.orm.nodes.data.structure import Kind, Site
+
+def get_kinds_raw(s):
+    """
+    The list of raw dictionaries of the kinds of a structure, as used to
+    annotate the TrajectoryData of NEB paths. This is exactly the content
+    of the 'kinds' attribute, so no Kind object needs to be built.
+    :param: s  a StructureData object
+    """
+
+    return s.get_attribute('kinds')
+
 def clone_aiida_structure (s):
     """
     A cloned structure is not quite ready to store more atoms. 
@@ -12,6 +29,17 @@ def clone_aiida_structure (s):
 
     return t
 
+def _empty_like(s):
+    """
+    A new structure with the same cell, pbc and kinds of s, but no sites.
+    Cheaper than a clone when all the sites are going to be replaced.
+    """
+
+    t = StructureData(cell=s.cell, pbc=s.pbc)
+    t.set_attribute('kinds', s.get_attribute('kinds'))
+
+    return t
+
 def aiida_struct_to_ase (s):
     """
     This is a custom version to bypass the inappropriate implementation
@@ -20,21 +48,30 @@ def aiida_struct_to_ase (s):
     tag to the "species number", which is the "kind number" + 1.
     """
 
-    import ase
-
     # Build a "species dictionary" mapping kind names to tags (starting at 1)
     _kinds = s.kinds
     sp_index = {}
-    for i in range(len(_kinds)):
-        sp_index[_kinds[i].name] = i + 1
-
-    s_ase = ase.Atoms(cell=s.cell, pbc=s.pbc)
+    kind_by_name = {}
+    for i, kind in enumerate(_kinds):
+        if kind.is_alloy or kind.has_vacancies:
+            raise ValueError("Cannot convert to ASE if the kind represents an alloy or it has vacancies.")
+        sp_index[kind.name] = i + 1
+        kind_by_name[kind.name] = kind
+
+    # All the atoms are passed at once, in the same way as site.get_ase would do one by one
+    sites = s.sites
+    site_kinds = [kind_by_name[site.kind_name] for site in sites]
+    positions = np.array([site.position for site in sites], dtype=np.float64).reshape(-1, 3)
+
+    s_ase = ase.Atoms(
+        symbols=[kind.symbol for kind in site_kinds],
+        positions=positions,
+        masses=[kind.mass for kind in site_kinds],
+        tags=[sp_index[kind.name] for kind in site_kinds],
+        cell=s.cell,
+        pbc=s.pbc
+    )
 
-    for site in s.sites:
-        ase_atom = site.get_ase(kinds=_kinds)
-        ase_atom.tag = sp_index[site.kind_name]
-        s_ase.append(ase_atom)
-        
     return s_ase
 
 #
@@ -46,9 +83,6 @@ def ase_struct_to_aiida(s_ase, kinds):
     :param: s_ase: The ASE object
     :param: kinds: The kinds object of a reference AiiDA structure
     """
-    
-    from aiida.orm import StructureData
-    import ase
 
     s = StructureData(cell=s_ase.cell)
 
@@ -61,14 +95,41 @@ def ase_struct_to_aiida(s_ase, kinds):
 
     return s
 
-    
+def structure_from_arrays(cell, positions, symbols):
+    """
+    Builds a StructureData object in one go from an array of positions
+    and a list of symbols, without the overhead of one append_atom call
+    (and the associated validation of all the kinds) per atom.
+    :param: cell  The cell vectors
+    :param: positions  A (n_atoms, 3) array of cartesian positions
+    :param: symbols  A list with the chemical symbol of each atom,
+            also used as name of the kinds
+    """
+
+    positions = np.asarray(positions, dtype=np.float64)
+    if positions.shape != (len(symbols), 3):
+        raise ValueError("positions must have shape (number of symbols, 3)")
+
+    kinds = {}
+    for symbol in symbols:
+        if symbol not in kinds:
+            kinds[symbol] = Kind(symbols=symbol, name=symbol).get_raw()
+
+    s = StructureData(cell=cell)
+    s.set_attribute('kinds', list(kinds.values()))
+    s.set_attribute(
+        'sites',
+        [{'kind_name': symbol, 'position': position} for symbol, position in zip(symbols, positions.tolist())]
+    )
+
+    return s
+
 def exchange_sites_in_structure(s, i1, i2):
     """
     Given a structure s, return another structure with the coordinates of hte i1, i2 sites interchanged
     :param: s  a StructureData object
     :param: i1, i2     site indexes to be exchanged
     """
-    from aiida.orm.nodes.data.structure import Site
 
     sites = s.sites
 
@@ -81,11 +142,9 @@ def exchange_sites_in_structure(s, i1, i2):
     sites[i1] = n1
     sites[i2] = n2
 
-    t = clone_aiida_structure(s)
-    t.clear_sites()
-
-    for site in sites:
-        t.append_site(site)
+    # The kinds do not change, so the sites can be set in one go
+    t = _empty_like(s)
+    t.set_attribute('sites', [site.get_raw() for site in sites])
 
     return t
 
@@ -104,154 +163,121 @@ def find_intermediate_structure(s, i1, intermediate_position, i2=None):
     :param: intermediate_position, a list of floats
 
     """
-    
-    import numpy as np
-    from aiida.orm.nodes.data.structure import Site
-    
-    i1_path_position = np.array(intermediate_position)
+
+    # The positions have only three components, so plain tuples
+    # and scalar arithmetic are used instead of numpy arrays
+    i1_path_position = tuple(float(x) for x in intermediate_position)
+
+    # Common case of a single migrating atom: only its raw site is replaced,
+    # without building the Site objects of the structure
+    if i2 is None:
+        raw_sites = list(s.get_attribute('sites'))
+        n1 = Site(kind_name=raw_sites[i1]['kind_name'], position=i1_path_position)
+        raw_sites[i1] = n1.get_raw()
+        intermediate_structure = _empty_like(s)
+        intermediate_structure.set_attribute('sites', raw_sites)
+        return intermediate_structure
 
     sites = s.sites
 
-    p1 = np.array(sites[i1].position)
+    p1 = sites[i1].position
     s1 = sites[i1]
     n1 = Site(kind_name=s1.kind_name, position=i1_path_position)
     sites[i1] = n1
 
-
     # The second atom's image position is obtained by
     # reversing the sign of the above relative position for i1
-    if i2 is not None:
-        p2 = np.array(sites[i2].position)
-        # Relative position of the path point and the first atom
-        p_wrt_p1 = i1_path_position - p1
-        i2_path_position = p2 - p_wrt_p1
-        s2 = sites[i2]
-        n2 = Site(kind_name=s2.kind_name, position=i2_path_position)
-        sites[i2] = n2
-
-    intermediate_structure = clone_aiida_structure(s)
-    intermediate_structure.clear_sites()
-    for site in sites:
-        intermediate_structure.append_site(site)
+    p2 = sites[i2].position
+    # Relative position of the path point and the first atom
+    p_wrt_p1 = [i1_path_position[i] - p1[i] for i in range(3)]
+    i2_path_position = tuple(p2[i] - p_wrt_p1[i] for i in range(3))
+    s2 = sites[i2]
+    n2 = Site(kind_name=s2.kind_name, position=i2_path_position)
+    sites[i2] = n2
+
+    # The kinds do not change, so the sites can be set in one go
+    intermediate_structure = _empty_like(s)
+    intermediate_structure.set_attribute('sites', [site.get_raw() for site in sites])
 
     return intermediate_structure
 
-def compute_mid_path_position(s, i1, i2, migration_direction):
+def _mid_path_point(p1, p2, cell, migration_direction, avoidance_radius=1.00):
     """
     The basic heuristic here is to avoid head-on collissions
-    by defining an "avoidance cylinder" around the line
-    joining the two atoms exchanged. The input "migration_direction"
-    serves to define a point on the surface of that cylinder, at
-    the mid-point, which is used as the mid-point of the starting path.
-
-    :param: s  a StructureData object
-    :param: i1, i2,  indexes of the atoms
+    by defining an "avoidance cylinder" of radius avoidance_radius
+    (in angstrom) around the line joining p1 and p2. The input
+    "migration_direction" serves to define a point on the surface of
+    that cylinder, at the mid-point, which is returned.
+    All the vectors have three components, so plain scalar arithmetic
+    is used instead of numpy.
+
+    :param: p1, p2  cartesian positions of the end points
+    :param: cell  the cell vectors
     :param: migration direction, in lattice coordinates
+    :return: the mid-path point as a list, or None if the migration
+             direction is near-parallel to the line p1-p2
     """
-    
-    import numpy as np
 
-    AVOIDANCE_RADIUS = 1.00  # 1.0 angstrom
-
-    cell = np.array(s.cell)
-    cell_direction = np.array(migration_direction)
-
-    cart_direction = np.matmul(cell,cell_direction)
-    
-    # Find positions of i1 and i2
-    sites = s.sites
-    p1 = np.array(sites[i1].position)
-    p2 = np.array(sites[i2].position)
+    # Cartesian migration direction (the same as numpy.matmul(cell, direction))
+    c = [sum(cell[i][j] * migration_direction[j] for j in range(3)) for i in range(3)]
 
     #
-    # Find the unit vector parallel to the line i1-i2
+    # Find the unit vector parallel to the line p1-p2
     #
-    d = p2 - p1
-    dmod = np.sqrt(d.dot(d))
-    u = d/dmod
+    d = [float(p2[i]) - float(p1[i]) for i in range(3)]
+    dmod = math.sqrt(d[0] * d[0] + d[1] * d[1] + d[2] * d[2])
+    u = [x / dmod for x in d]
 
     # Sanity check: migration direction should not be near-parallel
-    # to the line joining the exchanged atoms...
-    
-    cross_product = np.cross(d,cart_direction)
-    mod_cross_product = np.sqrt(cross_product.dot(cross_product))
-    mod_cd = np.sqrt(np.dot(cart_direction,cart_direction))
+    # to the line joining the two points
+    cross = [d[1] * c[2] - d[2] * c[1], d[2] * c[0] - d[0] * c[2], d[0] * c[1] - d[1] * c[0]]
+    mod_cross_product = math.sqrt(cross[0] * cross[0] + cross[1] * cross[1] + cross[2] * cross[2])
+    mod_cd = math.sqrt(c[0] * c[0] + c[1] * c[1] + c[2] * c[2])
 
-    if np.abs(mod_cross_product/(mod_cd*dmod)) < 1.0e-2:
+    if abs(mod_cross_product / (mod_cd * dmod)) < 1.0e-2:
         print("Migration direction near parallel to line of sight")
         return None
 
-    # Find component of cart_direction perpendicular to the i1-i2 line,
-    # and unit vector
+    # Find component of the cartesian direction perpendicular to the
+    # p1-p2 line, and unit vector
     #
-    c_perp = cart_direction - u.dot(cart_direction)*u
-    c_perp_mod = np.sqrt(c_perp.dot(c_perp))
-    u_perp = c_perp/c_perp_mod
-    
+    u_dot_c = u[0] * c[0] + u[1] * c[1] + u[2] * c[2]
+    c_perp = [c[i] - u_dot_c * u[i] for i in range(3)]
+    c_perp_mod = math.sqrt(c_perp[0] * c_perp[0] + c_perp[1] * c_perp[1] + c_perp[2] * c_perp[2])
+
     #
     # The mid-point of the path is now determined by the vector sum
     # of half of d and u_perp times the radius of the avoidance cylinder
     #
-    path_mid_point = p1 + 0.5*dmod*u + AVOIDANCE_RADIUS * u_perp
-
-    return path_mid_point.tolist()
+    return [float(p1[i]) + 0.5 * dmod * u[i] + avoidance_radius * c_perp[i] / c_perp_mod for i in range(3)]
 
-def find_mid_path_position(s, pos1, pos2, migration_direction):
+def compute_mid_path_position(s, i1, i2, migration_direction):
     """
     The basic heuristic here is to avoid head-on collissions
     by defining an "avoidance cylinder" around the line
-    joining the initial and final points . The input "migration_direction"
+    joining the two atoms exchanged. The input "migration_direction"
     serves to define a point on the surface of that cylinder, at
     the mid-point, which is used as the mid-point of the starting path.
 
     :param: s  a StructureData object
-    :param: pos1, pos2,  initial and final positions
+    :param: i1, i2,  indexes of the atoms
     :param: migration direction, in lattice coordinates
     """
-    
-    import numpy as np
-
-    AVOIDANCE_RADIUS = 1.00  # 1.0 angstrom
-
-    cell = np.array(s.cell)
-    cell_direction = np.array(migration_direction)
 
-    cart_direction = np.matmul(cell,cell_direction)
-    
-    # Find positions of i1 and i2
     sites = s.sites
-    p1 = np.array(pos1)
-    p2 = np.array(pos2)
+    return _mid_path_point(sites[i1].position, sites[i2].position, s.cell, migration_direction)
 
-    #
-    # Find the unit vector parallel to the line i1-i2
-    #
-    d = p2 - p1
-    dmod = np.sqrt(d.dot(d))
-    u = d/dmod
-
-    # Sanity check: migration direction should not be near-parallel
-    # to the line joining the two sites
-    
-    cross_product = np.cross(d,cart_direction)
-    mod_cross_product = np.sqrt(cross_product.dot(cross_product))
-    mod_cd = np.sqrt(np.dot(cart_direction,cart_direction))
-
-    if np.abs(mod_cross_product/(mod_cd*dmod)) < 1.0e-2:
-        print("Migration direction near parallel to line of sight")
-        return None
+def find_mid_path_position(s, pos1, pos2, migration_direction):
+    """
+    The basic heuristic here is to avoid head-on collissions
+    by defining an "avoidance cylinder" around the line
+    joining the initial and final points . The input "migration_direction"
+    serves to define a point on the surface of that cylinder, at
+    the mid-point, which is used as the mid-point of the starting path.
 
-    # Find component of cart_direction perpendicular to the i1-i2 line,
-    # and unit vector
-    #
-    c_perp = cart_direction - u.dot(cart_direction)*u
-    c_perp_mod = np.sqrt(c_perp.dot(c_perp))
-    u_perp = c_perp/c_perp_mod
-    
-    #
-    # The mid-point of the path is now determined by the vector sum
-    # of half of d and u_perp times the radius of the avoidance cylinder
-    #
-    path_mid_point = p1 + 0.5*dmod*u + AVOIDANCE_RADIUS * u_perp
+    :param: s  a StructureData object
+    :param: pos1, pos2,  initial and final positions
+    :param: migration direction, in lattice coordinates
+    """
 
-    return path_mid_point.tolist()
+    return _mid_path_point(pos1, pos2, s.cell, migration_direction)
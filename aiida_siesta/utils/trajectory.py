@@ -0,0 +1,29 @@
+#
+# Helpers for the construction of TrajectoryData objects
+#
+def trajectory_from_positions_array(cell, positions, symbols):
+    """
+    Builds a TrajectoryData directly from the array of the positions of
+    all the steps, without going through a StructureData per step.
+    :param: cell  The cell vectors, the same for all the steps, or
+            a (n_steps, 3, 3) array with the cell of each step
+    :param: positions  A (n_steps, n_atoms, 3) array of cartesian positions
+    :param: symbols  A list with the kind name of each atom. As for a
+            TrajectoryData built from structures, these are the names
+            to be matched by the `custom_kinds` of `get_step_structure`
+
+    :return: a TrajectoryData instance
+    """
+
+    import numpy as np
+    from aiida.orm import TrajectoryData
+
+    positions = np.asarray(positions, dtype=float)
+    cells = np.asarray(cell, dtype=float)
+    if cells.ndim == 2:
+        cells = np.repeat(cells[None], len(positions), axis=0)
+
+    traj = TrajectoryData()
+    traj.set_trajectory(symbols=list(symbols), positions=positions, cells=cells)
+
+    return traj
@@ -1,48 +1,116 @@
 #
 # Simple parser for xyz file
 #
+import re
+
+# The species label at the start of each line of a xyz file
+_LABEL_COLUMN = re.compile(rb"^[ \t]*\S+[ \t]+", re.MULTILINE)
+
 def get_positions_from_xyz_file(file, natoms=None):
+    """
+    Reads the positions in a xyz file, with or without species labels.
+    :param: file  The xyz file
+    :param: natoms  If present, only the positions of the first natoms atoms
+            are read
+
+    :return: a (number of atoms, 3) numpy array
+    """
+    import numpy as np
+    from itertools import chain
 
-    positions = []
     with open(file,'r') as fh:
-        lines=fh.readlines()
-        
-        number_of_atoms = len(lines)-2
-        if natoms is not None:
-            if natoms > number_of_atoms:
-                raise ValueError
-            number_of_atoms = natoms
-            
-        for line in lines[2:number_of_atoms+2]:
-            parts = line.split()
-            # Support the case in which the species label is present
-            if len(parts) == 4:
-                start = 1
-            else:
-                start = 0
-            pos = [ float(i) for i in parts[start:] ]
-            positions.append(pos)
-                    
+        # Skip the number of atoms and the comment line
+        fh.readline()
+        fh.readline()
+
+        first_line = fh.readline()
+        # Support the case in which the species label is present
+        if len(first_line.split()) == 4:
+            usecols = (1, 2, 3)
+        else:
+            usecols = (0, 1, 2)
+
+        # The lines are streamed from the file object (the file is never loaded
+        # as a whole) and, if natoms is given, the reading stops after natoms lines
+        if first_line.strip():
+            positions = np.loadtxt(
+                chain([first_line], fh), dtype=np.float64, usecols=usecols, max_rows=natoms, ndmin=2
+            )
+        else:
+            positions = np.empty((0, 3), dtype=np.float64)
+
+    if natoms is not None and natoms > len(positions):
+        raise ValueError
+
     return positions
 
+def get_xyz_files_in_folder(folder):
+    """
+    The .xyz files in a folder, sorted by name.
+    :param: folder  The folder
+    """
+
+    import os
+
+    # A single pass over the directory entries. As with glob, hidden files are skipped
+    with os.scandir(folder) as entries:
+        xyz_list = sorted(
+            entry.path for entry in entries if entry.name.endswith('.xyz') and not entry.name.startswith('.')
+        )
+
+    return xyz_list
+
+def _read_positions_from_files(xyz_list, natoms):
+    """
+    Reads the positions in a list of xyz files, in the same order.
+    The files are independent and the parsing is mostly I/O and numpy
+    work (which releases the GIL), so they are read by a pool of threads.
+    :param: xyz_list  The list of files
+    :param: natoms  The number of atoms to read from each file
+
+    :return: a list of (natoms, 3) numpy arrays
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    if len(xyz_list) < 2:
+        return [get_positions_from_xyz_file(file, natoms) for file in xyz_list]
+
+    with ThreadPoolExecutor(max_workers=min(8, len(xyz_list))) as executor:
+        return list(executor.map(lambda file: get_positions_from_xyz_file(file, natoms), xyz_list))
+
+def get_positions_array_from_folder(folder, natoms):
+    """
+    Reads the positions of the first natoms atoms of all the .xyz files
+    in a folder.
+    :param: folder  The folder
+    :param: natoms  The number of atoms to read from each file
+
+    :return: a (number of files, natoms, 3) numpy array
+    """
+
+    import numpy as np
+
+    frames = _read_positions_from_files(get_xyz_files_in_folder(folder), natoms)
+    if not frames:
+        return np.empty((0, natoms, 3))
+
+    return np.stack(frames)
+
 def get_structure_list_from_folder(folder,ref_struct):
     """
     Builds a list of structures from a set of .xyz files in a folder.
     :param: folder  The folder
     :param: ref_struct A reference structure to provide a basic template
     """
-    
-    import glob
-
-    xyz_list = glob.glob("{}/*.xyz".format(folder))
-    xyz_list.sort()
 
     # We will get this many atoms from the xyz files
     natoms = len(ref_struct.sites)
     
+    # The files are read in parallel, but the structures are built
+    # here, serially, as StructureData objects are not thread-safe
     structure_list = []
-    for file in xyz_list:
-        positions = get_positions_from_xyz_file(file, natoms)
+    for positions in _read_positions_from_files(get_xyz_files_in_folder(folder), natoms):
         s = ref_struct.clone()
         s.reset_sites_positions(positions)
         structure_list.append(s)
@@ -55,23 +123,19 @@ def write_xyz_file_from_structure(s, filename, labels=True):
 
    if labels:
        # We add the labels
-       open(filename, 'wb').write(xyz_tuple[0])
+       with open(filename, 'wb') as f:
+           f.write(xyz_tuple[0])
    else:
        # We need to remove the labels
-       # First, turn bytes into string and split
-       lines = xyz_tuple[0].decode().split("\n")
-       with open(filename,"w") as f:
-           #
-           # Write first two lines
-           #
-           f.write("{}\n".format(lines[0]))
-           f.write("{}\n".format(lines[1]))
-           #
-           # Write only positions
-           #
-           for line in lines[2:] :
-               pos = line.split()[1:]
-               f.write("{} {} {}\n".format(pos[0],pos[1],pos[2]))
+       # The first two lines are kept, then the first column
+       # of every line is removed at once, on the bytes
+       number_line, _, rest = xyz_tuple[0].partition(b"\n")
+       comment_line, _, body = rest.partition(b"\n")
+       positions = _LABEL_COLUMN.sub(b"", body)
+       if not positions.endswith(b"\n"):
+           positions += b"\n"
+       with open(filename, 'wb') as f:
+           f.write(number_line + b"\n" + comment_line + b"\n" + positions)
                
 
 def write_xyz_files_from_trajectory(t, ref_struct, pattern, labels = True ):
@@ -1,11 +1,11 @@
 from aiida import orm
 from aiida.engine import WorkChain, ToContext
-from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain
+from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain, validate_odd_n_images
 from aiida_siesta.workflows.base import SiestaBaseWorkChain
 from aiida_siesta.utils.structures import exchange_sites_in_structure
 from aiida_siesta.utils.structures import compute_mid_path_position
 from aiida_siesta.utils.structures import find_intermediate_structure
-from aiida_siesta.utils.interpol import interpolate_two_structures_ase
+from aiida_siesta.utils.interpol import interpolate_two_structures_positions, path_trajectory
 
 class ExchangeBarrierWorkChain(WorkChain):
 
@@ -39,8 +39,8 @@ class ExchangeBarrierWorkChain(WorkChain):
         spec.input('migration_direction', valid_type=orm.List, 
                    help='Migration direction (in lattice coordinates)')
 
-        spec.input('n_images', valid_type=orm.Int,
-                   help='Number of (internal) images in Path (odd!!)') # validate
+        spec.input('n_images', valid_type=orm.Int, validator=validate_odd_n_images,
+                   help='Number of (internal) images in Path (odd!!)')
 
         spec.expose_outputs(SiestaBaseNEBWorkChain)
 
@@ -73,7 +73,7 @@ class ExchangeBarrierWorkChain(WorkChain):
         self.ctx.s_initial = s_initial
         self.ctx.s_final = s_final
 
-        self.report(f'Created initial and final structures')
+        self.logger.debug('Created initial and final structures')
 
     def relax_initial(self):
         """
@@ -148,25 +148,18 @@ class ExchangeBarrierWorkChain(WorkChain):
                                                      i1_mid_path_position)
 
         #
-        # The starting_path is now built from two sections
-        # We assume that the number of internal images is odd,
-        # so that n_images // 2 is the number of internal images
-        # of each section
-
-        first_list = interpolate_two_structures_ase(s_initial,
-                                                    s_intermediate,
-                                                     n_images//2)
-        second_list = interpolate_two_structures_ase(s_intermediate,
-                                                    s_final,
-                                                     n_images//2)
-
-        #
-        # Remove duplicate central point
-        #
-        images_list = first_list[:-1] + second_list
+        # The starting_path goes through the intermediate structure,
+        # which is the central image. It is seeded linearly in two sections
+        # and then optimized by idpp in a single run, as a whole path.
+        # The number of internal images must be odd
         
-        if len(images_list) != n_images+2:
-            self.report(f"Number of images: {n_images} /= list length")
+        try:
+            frames = interpolate_two_structures_positions(s_initial,
+                                                          s_final,
+                                                          n_images, method="idpp",
+                                                          s_mid=s_intermediate)
+        except ValueError as exc:
+            self.report(f"Cannot build the path for {n_images} images: {exc}")
             return self.exit_codes.ERROR_CONFIG
             
         #
@@ -176,13 +169,10 @@ class ExchangeBarrierWorkChain(WorkChain):
         # refined_path = refine_neb_path(starting_path)
         
 
-        path_object = orm.TrajectoryData(images_list)
+        # The path is built directly from the stacked positions, annotated
+        # with a 'serializable' dictionary instead of the actual kinds list
         #
-        # Use a 'serializable' dictionary instead of the 
-        # actual kinds list
-        #
-        _kinds_raw = [ k.get_raw() for k in s_initial.kinds ]
-        path_object.set_attribute('kinds', _kinds_raw)
+        path_object = path_trajectory(s_initial, s_final, frames)
         
         self.ctx.path = path_object
 
@@ -193,8 +183,8 @@ class ExchangeBarrierWorkChain(WorkChain):
 
         inputs = self.exposed_inputs(SiestaBaseNEBWorkChain, namespace='neb')
 
-        print(inputs)
-        
+        self.logger.debug('Inputs of the NEB workchain: %s', list(inputs.keys()))
+
         inputs['starting_path'] = self.ctx.path
 
         running = self.submit(SiestaBaseNEBWorkChain, **inputs)
@@ -212,8 +202,7 @@ class ExchangeBarrierWorkChain(WorkChain):
         if not self.ctx.neb_wk.is_finished_ok:
                 return self.exit_codes.ERROR_NEB_WK
 
-        outps = self.ctx.neb_wk.outputs
-        self.out('neb_output_package', outps['neb_output_package'])
+        self.out('neb_output_package', self.ctx.neb_wk.outputs.neb_output_package)
 
         self.report(f'ExchangeBarrier workchain done.')
             
@@ -1,9 +1,121 @@
+import numpy as np
+from ase.data import atomic_numbers, chemical_symbols, covalent_radii
+from ase.geometry import get_distances
 from aiida import orm
-from aiida.engine import WorkChain, ToContext
+from aiida.engine import WorkChain, ToContext, calcfunction, if_
 from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain
 from aiida_siesta.workflows.base import SiestaBaseWorkChain
-from aiida_siesta.utils.structures import clone_aiida_structure
-from aiida_siesta.utils.interpol import interpolate_two_structures_ase
+from aiida_siesta.utils.interpol import interpolate_path
+
+# Extra holding the key of the inputs of a successful run, for its reuse
+_INPUTS_KEY_EXTRA = 'interstitial_inputs_key'
+# Input controlling the reuse, which does not change the results
+_REUSE_INPUT = 'reuse_previous_run'
+
+# Interstitial positions closer to a host atom than this fraction of the sum
+# of their covalent radii are rejected, as the calculations would surely fail
+_MIN_DISTANCE_FACTOR = 0.5
+
+
+@calcfunction
+def add_interstitial(host, symbol, initial_position, final_position):
+    """
+    Calcfunction creating the initial and final structures of an
+    interstitial migration, by adding the interstitial atom to the host.
+    The host kinds and sites are serialized once and shared by both
+    end-points, which are built directly instead of cloning the host twice.
+    :param host: The host structure
+    :param symbol: A Str with the chemical symbol of the interstitial. Its kind
+           is named after it, with an '_int' suffix
+    :param initial_position, final_position: Lists with the positions of the interstitial
+    :return: A dictionary with the 'initial' and 'final' structures
+    """
+
+    atom_symbol = symbol.value
+    kinds_raw = [kind.get_raw() for kind in host.kinds]
+    sites_raw = [site.get_raw() for site in host.sites]
+
+    structures = {}
+    for label, position in (('initial', initial_position), ('final', final_position)):
+        structure = orm.StructureData(cell=host.cell, pbc=host.pbc)
+        structure.set_attribute('kinds', list(kinds_raw))
+        structure.set_attribute('sites', list(sites_raw))
+        structure.append_atom(symbols=atom_symbol, position=position.get_list(), name=atom_symbol + '_int')
+        structures[label] = structure
+
+    return structures
+
+
+def get_inputs_key(node):
+    """
+    The key identifying the runs of a workchain with the same inputs, built
+    from the link labels and hashes of all the inputs of its node (except
+    the one controlling the reuse of previous runs)
+    """
+    from hashlib import blake2b
+    from aiida.common.links import LinkType
+
+    inputs_hashes = sorted(
+        (entry.link_label, entry.node.get_hash())
+        for entry in node.get_incoming(link_type=LinkType.INPUT_WORK).all()
+        if entry.link_label != _REUSE_INPUT
+    )
+    return blake2b(repr(inputs_hashes).encode(), digest_size=16).hexdigest()
+
+
+def find_previous_run(node, inputs_key):
+    """
+    A successful run of the same workchain as node, whose inputs had
+    the given key, or None if there is none
+    """
+    qb = orm.QueryBuilder()
+    qb.append(orm.WorkChainNode, filters={
+        'process_type': node.process_type,
+        f'extras.{_INPUTS_KEY_EXTRA}': inputs_key,
+        'attributes.process_state': 'finished',
+        'attributes.exit_status': 0,
+    })
+    previous = qb.first()
+
+    return None if previous is None else previous[0]
+
+
+def check_interstitial_positions(host, symbol, positions):
+    """
+    Check that the interstitial is a known element and that its positions
+    are lists of three numbers which do not overlap the host atoms, taking
+    into account their periodic images
+    :param host: The host structure
+    :param symbol: The chemical symbol of the interstitial
+    :param positions: The positions of the interstitial
+    :return: A message describing the first error found, or None
+    """
+
+    if symbol not in chemical_symbols:
+        return f"Unknown chemical symbol '{symbol}' for the interstitial"
+    for position in positions:
+        # bool is a subclass of int, but not a coordinate
+        if len(position) != 3 or not all(
+            isinstance(x, (int, float)) and not isinstance(x, bool) for x in position
+        ):
+            return f"Interstitial position {position} is not a list of three numbers"
+
+    kind_radius = {
+        kind.name: max(covalent_radii[atomic_numbers.get(kind_symbol, 0)] for kind_symbol in kind.symbols)
+        for kind in host.kinds
+    }
+    host_positions = np.array([site.position for site in host.sites])
+    host_radii = np.array([kind_radius[site.kind_name] for site in host.sites])
+    contact = covalent_radii[atomic_numbers[symbol]] + host_radii
+    _, distances = get_distances(positions, host_positions, cell=host.cell, pbc=host.pbc)
+    for position, position_distances in zip(positions, distances):
+        closest = np.argmin(position_distances / contact)
+        if position_distances[closest] < _MIN_DISTANCE_FACTOR * contact[closest]:
+            return (f"Interstitial position {position} overlaps host atom {closest} "
+                    f"(distance {position_distances[closest]:.3f} Ang)")
+
+    return None
+
 
 class InterstitialBarrierWorkChain(WorkChain):
 
@@ -11,6 +123,10 @@ class InterstitialBarrierWorkChain(WorkChain):
     Workchain to compute the barrier for interstitial
     diffusion starting from the host structure and
     initial and final interstitial positions
+
+    If a previous successful run with exactly the same inputs exists, its
+    results are returned instead of running again. Set the
+    `reuse_previous_run` input to False to force a new run.
     """
 
     @classmethod
@@ -42,22 +158,59 @@ class InterstitialBarrierWorkChain(WorkChain):
 
         spec.input('n_images', valid_type=orm.Int,
                    help='Number of (internal) images  in Path')
+        spec.input(_REUSE_INPUT, valid_type=orm.Bool, default=lambda: orm.Bool(True),
+                   help='Whether to reuse the results of a previous successful run with the same inputs')
 
         spec.expose_outputs(SiestaBaseNEBWorkChain)
 
         spec.outline(
 
-            cls.prepare_structures,
-            cls.relax_initial,
-            cls.relax_final,
-            cls.prepare_initial_path,
-            cls.run_NEB_workchain,
-            cls.check_results
+            cls.check_previous_runs,
+            if_(cls.is_new_run)(
+                cls.prepare_structures,
+                cls.relax_endpoints,
+                cls.prepare_initial_path,
+                cls.run_NEB_workchain,
+                cls.check_results
+            ).else_(
+                cls.reuse_previous_run
+            )
         )
         spec.exit_code(200, 'ERROR_MAIN_WC', message='The end-point relaxation SiestaBaseWorkChain failed')
         spec.exit_code(250, 'ERROR_CONFIG', message='Cannot figure out interstitial position(s)')
         spec.exit_code(300, 'ERROR_NEB_WK', message='NEBWorkChain did not finish correctly')
 
+    def check_previous_runs(self):
+        """
+        Look for a successful run of this workchain with the same inputs. The
+        runs are identified by a key built from the hashes of all their inputs,
+        saved in an extra when they finish. No run is looked for if the reuse
+        is disabled with the `reuse_previous_run` input.
+        """
+        self.ctx.inputs_key = get_inputs_key(self.node)
+
+        if not self.inputs[_REUSE_INPUT].value:
+            return
+
+        previous = find_previous_run(self.node, self.ctx.inputs_key)
+        if previous is not None:
+            self.ctx.previous_run = previous
+
+    def is_new_run(self):
+        """
+        Whether the workchain has to run, as no previous run with the same inputs exists
+        """
+        return 'previous_run' not in self.ctx
+
+    def reuse_previous_run(self):
+        """
+        Return the results of the previous run with the same inputs
+        """
+        previous = self.ctx.previous_run
+        self.out('neb_output_package', previous.outputs.neb_output_package)
+
+        self.report(f'Reused the results of InterstitialBarrierWorkChain<{previous.pk}>, run with the same inputs.')
+
     def prepare_structures(self):
         """
         Make copies of host structure and add interstitials
@@ -68,58 +221,56 @@ class InterstitialBarrierWorkChain(WorkChain):
         final_position = self.inputs.final_position.get_list()
         atom_symbol = self.inputs.interstitial_symbol.value
 
+        # The common configuration errors are caught before trying to add the atoms
+        error = check_interstitial_positions(host, atom_symbol, (initial_position, final_position))
+        if error is not None:
+            self.report(error)
+            return self.exit_codes.ERROR_CONFIG
+
         # With pseudo families and smart fallback to chemical symbol,
         # the addition of '_int' to the interstitial atom is easily supported
         # If not, the pseudo must be manually included.
         #
-        s_initial = clone_aiida_structure(host)
-        s_final   = clone_aiida_structure(host)
-
+        # The end-points are created by a calcfunction, which keeps their
+        # provenance from the host structure
         try:
-            s_initial.append_atom(symbols=atom_symbol,
-                                  position=initial_position,
-                                  name=atom_symbol+ '_int')
-
-            s_final.append_atom(symbols=atom_symbol,
-                                position=final_position,
-                                name=atom_symbol+ '_int')
-        except:
-            self.report("Problem adding atom to end-points")
+            end_points = add_interstitial(host, self.inputs.interstitial_symbol,
+                                          self.inputs.initial_position, self.inputs.final_position)
+        except ValueError as exc:
+            self.report(f"Problem adding atom to end-points: {exc}")
             return self.exit_codes.ERROR_CONFIG
 
+        s_initial = end_points['initial']
+        s_final = end_points['final']
+
         self.ctx.s_initial = s_initial
         self.ctx.s_final = s_final
         self.ctx.atom_symbol = atom_symbol
 
-        self.report(f'Created initial and final structures')
+        self.logger.debug('Created initial and final structures')
 
-    def relax_initial(self):
+    def relax_endpoints(self):
         """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
+        Run the SiestaBaseWorkChains for the initial and final structures, might
+        be relaxations or scf only. Both are submitted in the same step, so that
+        they run concurrently.
         """
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
                                      namespace='initial')
         inputs['structure'] = self.ctx.s_initial
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the initial structure.')
-
-        return ToContext(initial_relaxation_wk=running)
-
-    def relax_final(self):
-        """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
-        """
+        running_initial = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_initial.pk}> to relax the initial structure.')
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
                                      namespace='final')
         inputs['structure'] = self.ctx.s_final
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the final structure.')
+        running_final = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_final.pk}> to relax the final structure.')
 
-        return ToContext(final_relaxation_wk=running)
+        return ToContext(initial_relaxation_wk=running_initial, final_relaxation_wk=running_final)
 
 
     def prepare_initial_path(self):
@@ -140,8 +291,6 @@ class InterstitialBarrierWorkChain(WorkChain):
         s_initial = initial_wk.outputs.output_structure
         s_final = final_wk.outputs.output_structure
 
-        n_images = self.inputs.n_images.value
-
         #
         # Add here any heuristics, before handling the
         # path for further refinement
@@ -154,16 +303,9 @@ class InterstitialBarrierWorkChain(WorkChain):
         #
         # refined_path = refine_neb_path(starting_path)
         
-        images_list = interpolate_two_structures_ase(s_initial,
-                                                     s_final,
-                                                     n_images)
-        path_object = orm.TrajectoryData(images_list)
-        #
-        # Use a 'serializable' dictionary instead of the 
-        # actual kinds list
-        #
-        _kinds_raw = [ k.get_raw() for k in s_initial.kinds ]
-        path_object.set_attribute('kinds', _kinds_raw)
+        # The path is generated by a calcfunction, so that it has provenance.
+        # The calcfunction annotates the path with the kinds and the method itself
+        path_object = interpolate_path(s_initial, s_final, self.inputs.n_images, orm.Str('idpp'))
         
         self.ctx.path = path_object
 
@@ -174,8 +316,8 @@ class InterstitialBarrierWorkChain(WorkChain):
 
         inputs = self.exposed_inputs(SiestaBaseNEBWorkChain, namespace='neb')
 
-        print(inputs)
-        
+        self.logger.debug('Inputs of the NEB workchain: %s', list(inputs.keys()))
+
         inputs['starting_path'] = self.ctx.path
 
         running = self.submit(SiestaBaseNEBWorkChain, **inputs)
@@ -193,8 +335,9 @@ class InterstitialBarrierWorkChain(WorkChain):
         if not self.ctx.neb_wk.is_finished_ok:
                 return self.exit_codes.ERROR_NEB_WK
 
-        outps = self.ctx.neb_wk.outputs
-        self.out('neb_output_package', outps['neb_output_package'])
+        self.out('neb_output_package', self.ctx.neb_wk.outputs.neb_output_package)
+        # Later runs with the same inputs can now reuse these results
+        self.node.set_extra(_INPUTS_KEY_EXTRA, self.ctx.inputs_key)
 
         self.report(f'InterstitialBarrier workchain done.')
             
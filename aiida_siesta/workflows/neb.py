@@ -1,17 +1,38 @@
 from aiida import orm
-from aiida.engine import WorkChain, calcfunction, ToContext
-from aiida.common import AttributeDict
+from aiida.engine import WorkChain, ToContext
 from aiida_siesta.workflows.base import SiestaBaseWorkChain
 from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain
-from aiida_siesta.calculations.tkdict import FDFDict
-from aiida_siesta.utils.interpol import interpolate_two_structures_ase
+from aiida_siesta.utils.interpol import interpolate_path, INTERPOLATION_METHODS
 
 
-class NEBWorkChain(WorkChain):
+def validate_interpolation_method(value, _):
+    """
+    Validator of the method used to interpolate the starting path
+    """
+    if value.value not in INTERPOLATION_METHODS:
+        return f"Unknown interpolation method '{value.value}', not one of {', '.join(INTERPOLATION_METHODS)}"
+
 
+def validate_interpolation_methods(value, _):
     """
-    Workchain to run a NEB MEP optimization
-    starting from two end-point structures
+    Validator of the list of methods used to interpolate the starting paths.
+    The methods are used as output and context labels, so they must be unique
+    """
+    methods = value.get_list()
+    if not methods:
+        return 'At least one interpolation method is needed'
+    unknown = [method for method in methods if method not in INTERPOLATION_METHODS]
+    if unknown:
+        return f"Unknown interpolation methods {unknown}, not among {', '.join(INTERPOLATION_METHODS)}"
+    if len(set(methods)) != len(methods):
+        return f'Repeated interpolation methods in {methods}'
+
+
+class _NEBEndPointsWorkChain(WorkChain):
+
+    """
+    Base of the workchains running NEB MEP optimizations starting
+    from two end-point structures, which are relaxed first
     """
 
     @classmethod
@@ -28,49 +49,59 @@ class NEBWorkChain(WorkChain):
         spec.input('n_images', valid_type=orm.Int,
                    help='Number of (internal) images  in Path')
 
-        # Note: in this version, n_images must be compatible
-        # with the Lua script settings.. 
-        
-        spec.output('neb_output_package', valid_type=orm.TrajectoryData)
-
-        spec.outline(
-
-            cls.relax_initial,
-            cls.relax_final,
-            cls.generate_starting_path,
-            cls.run_neb,
-            cls.run_results,
-        )
         spec.exit_code(200, 'ERROR_MAIN_WC', message='The end-point relaxation SiestaBaseWorkChain failed')
-        spec.exit_code(201, 'ERROR_FINAL_WC', message='The NEB calculation failed')
 
-    def relax_initial(self):
+    def relax_endpoints(self):
         """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
+        Run the SiestaBaseWorkChains for the initial and final structures, might
+        be relaxations or scf only. Both are submitted in the same step, so that
+        they run concurrently.
         """
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
                                      namespace='initial')
         inputs['structure'] = self.inputs.initial_structure
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the initial structure.')
-
-        return ToContext(initial_relaxation_wk=running)
-
-    def relax_final(self):
-        """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
-        """
+        running_initial = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_initial.pk}> to relax the initial structure.')
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
                                      namespace='final')
         inputs['structure'] = self.inputs.final_structure
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the final structure.')
+        running_final = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_final.pk}> to relax the final structure.')
+
+        return ToContext(initial_relaxation_wk=running_initial, final_relaxation_wk=running_final)
+
+
+class NEBWorkChain(_NEBEndPointsWorkChain):
+
+    """
+    Workchain to run a NEB MEP optimization
+    starting from two end-point structures
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.input('interpolation_method', valid_type=orm.Str, default=lambda: orm.Str('idpp'),
+                   validator=validate_interpolation_method,
+                   help='Method used by ASE to interpolate the starting path (idpp or linear)')
+
+        # Note: in this version, n_images must be compatible
+        # with the Lua script settings.. 
+        
+        spec.output('neb_output_package', valid_type=orm.TrajectoryData)
+
+        spec.outline(
 
-        return ToContext(final_relaxation_wk=running)
+            cls.relax_endpoints,
+            cls.generate_starting_path,
+            cls.run_neb,
+            cls.run_results,
+        )
+        spec.exit_code(201, 'ERROR_FINAL_WC', message='The NEB calculation failed')
 
     def generate_starting_path(self):
 
@@ -85,17 +116,15 @@ class NEBWorkChain(WorkChain):
         s_initial = initial_wk.outputs.output_structure
         s_final = final_wk.outputs.output_structure
 
-        n_images = self.inputs.n_images.value
-        images_list = interpolate_two_structures_ase(s_initial,
-                                                     s_final,
-                                                     n_images)
-        path_object = orm.TrajectoryData(images_list)
         #
-        # Use a 'serializable' dictionary instead of the 
-        # actual kinds list
+        # The path is generated by a calcfunction, directly from the arrays of
+        # positions. It is annotated with a 'serializable' dictionary instead of
+        # the actual kinds list, and with the interpolation method used, which is
+        # also part of the hash of the path
         #
-        _kinds_raw = [ k.get_raw() for k in s_initial.kinds ]
-        path_object.set_attribute('kinds', _kinds_raw)
+        path_object = interpolate_path(s_initial, s_final,
+                                       self.inputs.n_images,
+                                       self.inputs.interpolation_method)
         
         self.ctx.path = path_object
 
@@ -108,8 +137,8 @@ class NEBWorkChain(WorkChain):
         """
         inputs = self.exposed_inputs(SiestaBaseNEBWorkChain, namespace='neb')
 
-        print(inputs)
-        
+        self.logger.debug('Inputs of the NEB workchain: %s', list(inputs.keys()))
+
         inputs['starting_path'] = self.ctx.path
 
         running = self.submit(SiestaBaseNEBWorkChain, **inputs)
@@ -122,16 +151,101 @@ class NEBWorkChain(WorkChain):
 
         if not self.ctx.neb_wk.is_finished_ok:
                 return self.exit_codes.ERROR_FINAL_WC
-        else:
-            outps = self.ctx.neb_wk.outputs
 
-        neb_output = outps['neb_output_package']
+        neb_output = self.ctx.neb_wk.outputs.neb_output_package
         n_iterations = neb_output.get_attribute('neb_iterations')
         
         self.out('neb_output_package', neb_output)
         self.report(f'NEB process done in {n_iterations} iterations.')
 
 
+class NEBSweepWorkChain(_NEBEndPointsWorkChain):
+
+    """
+    Workchain to run several NEB MEP optimizations between the same
+    two end-point structures, one for each starting path interpolation
+    method. The end-points are relaxed only once, and the NEB
+    calculations run concurrently.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.input('interpolation_methods', valid_type=orm.List,
+                   default=lambda: orm.List(list=['idpp', 'linear']),
+                   validator=validate_interpolation_methods,
+                   help='Methods used by ASE to interpolate the starting paths, one NEB for each')
+
+        # Note: the n_images is common to all the NEB calculations, as it
+        # must be compatible with the Lua script settings..
+
+        spec.output_namespace('neb_output_packages', valid_type=orm.TrajectoryData, dynamic=True,
+                              help='The NEB output of each interpolation method')
+
+        spec.outline(
+
+            cls.relax_endpoints,
+            cls.generate_starting_paths,
+            cls.run_nebs,
+            cls.run_results,
+        )
+        spec.exit_code(201, 'ERROR_FINAL_WC', message='All the NEB calculations failed')
+
+    def generate_starting_paths(self):
+
+        initial_wk =  self.ctx.initial_relaxation_wk
+        if not initial_wk.is_finished_ok:
+            return self.exit_codes.ERROR_MAIN_WC
+
+        final_wk =  self.ctx.final_relaxation_wk
+        if not final_wk.is_finished_ok:
+            return self.exit_codes.ERROR_MAIN_WC
+
+        s_initial = initial_wk.outputs.output_structure
+        s_final = final_wk.outputs.output_structure
+
+        self.ctx.paths = {}
+        for method in self.inputs.interpolation_methods.get_list():
+            self.ctx.paths[method] = interpolate_path(s_initial, s_final,
+                                                      self.inputs.n_images,
+                                                      orm.Str(method))
+
+        self.report(f'Generated starting paths for NEB: {", ".join(self.ctx.paths)}.')
+
+    def run_nebs(self):
+        """
+        Submit all the NEB workchains at once, so that they run concurrently
+        """
+        running = {}
+        for method, path in self.ctx.paths.items():
+            inputs = self.exposed_inputs(SiestaBaseNEBWorkChain, namespace='neb')
+            inputs['starting_path'] = path
+
+            node = self.submit(SiestaBaseNEBWorkChain, **inputs)
+            self.report(f'Launched SiestaBaseNEBWorkChain<{node.pk}> for NEB from the {method} path.')
+            running[f'neb_wk_{method}'] = node
+
+        return ToContext(**running)
+
+    def run_results(self):
+
+        n_ok = 0
+        for method in self.ctx.paths:
+            neb_wk = self.ctx[f'neb_wk_{method}']
+            if not neb_wk.is_finished_ok:
+                self.report(f'The NEB from the {method} path failed.')
+                continue
+
+            neb_output = neb_wk.outputs.neb_output_package
+            n_iterations = neb_output.get_attribute('neb_iterations')
+            self.out(f'neb_output_packages.{method}', neb_output)
+            self.report(f'NEB process from the {method} path done in {n_iterations} iterations.')
+            n_ok += 1
+
+        if n_ok == 0:
+            return self.exit_codes.ERROR_FINAL_WC
+
+
 #    @classmethod
 #    def inputs_generator(cls):  # pylint: disable=no-self-argument,no-self-use
 #        from aiida_siesta.utils.inputs_generators import BaseWorkChainInputsGenerator
@@ -1,13 +1,44 @@
+import json
+from functools import lru_cache
 from aiida import orm
 from aiida.engine import WorkChain, calcfunction, ToContext
 from aiida_siesta.calculations.siesta import SiestaCalculation
 from aiida.orm.nodes.data.structure import Kind
 
+
+@lru_cache(maxsize=128)
+def _kinds_from_raw(kinds_json):
+    """
+    The Kind objects described by a JSON dump of their raw dictionaries.
+    Kinds are only read when building structures, so the same objects can
+    be shared by all the paths annotated with the same kinds.
+    """
+    return tuple(Kind(raw=kr) for kr in json.loads(kinds_json))
+
+
+def validate_odd_n_images(value, _):
+    """
+    Validator of the number of internal images of paths built around a
+    central image, which must be odd. Checked before any calculation runs.
+    """
+    if value.value % 2 == 0:
+        return 'The number of (internal) images must be odd'
+
+
 class SiestaBaseNEBWorkChain(WorkChain):
 
     """
     Workchain to run a NEB MEP optimization
     starting from a guessed path
+
+    NEB calculations with the same inputs as a previous one can be taken from
+    the cache, but only if caching is enabled for siesta calculations in the
+    profile, as it is left to the user: note that cached calculations share the
+    remote folder of the original one. With aiida-core 1.6 or later, run
+    `verdi config set caching.enabled_for aiida.calculations:siesta.siesta`.
+    With earlier versions, list `aiida.calculations:siesta.siesta` under
+    `enabled` for the profile in the `cache_config.yml` file of the AiiDA
+    configuration folder.
     """
 
     @classmethod
@@ -78,7 +109,7 @@ class SiestaBaseNEBWorkChain(WorkChain):
             return self.exit_codes.ERROR_PATH_SPEC
 
         # Create proper kinds list from list of raw dictionaries
-        _kinds = [ Kind(raw=kr) for kr in _kinds_raw]
+        _kinds = list(_kinds_from_raw(json.dumps(_kinds_raw, sort_keys=True)))
         
         ref_structure = path.get_step_structure(0,custom_kinds=_kinds)
         
@@ -104,6 +135,11 @@ class SiestaBaseNEBWorkChain(WorkChain):
             'options': self.inputs.options.get_dict(),
          }
 
+        # If caching is enabled for siesta calculations in the profile, a NEB calculation
+        # with exactly the same inputs as a previous one is not rerun (see the docstring
+        # of the class). Note that the hash of the starting_path includes its arrays and
+        # attributes, among them the raw 'kinds', so paths generated from the same
+        # end-points hash identically
         running = self.submit(SiestaCalculation, **inputs)
         self.report(f'Launched SiestaCalculation<{running.pk}> for NEB.')
 
@@ -113,12 +149,10 @@ class SiestaBaseNEBWorkChain(WorkChain):
 
         if not self.ctx.neb_wk.is_finished_ok:
                 return self.exit_codes.ERROR_NEB_CALC
-        else:
-            outps = self.ctx.neb_wk.outputs
 
         # We might also take the 'retrieved' folder and parse the NEB data here
         #
-        neb_output = outps['neb_output_images']
+        neb_output = self.ctx.neb_wk.outputs.neb_output_images
         n_iterations = neb_output.get_attribute('neb_iterations')
         
         self.out('neb_output_package', neb_output)
@@ -1,18 +1,31 @@
 from aiida import orm
 from aiida.engine import WorkChain, ToContext
-from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain
+from aiida_siesta.workflows.neb_base import SiestaBaseNEBWorkChain, validate_odd_n_images
 from aiida_siesta.workflows.base import SiestaBaseWorkChain
 
-from aiida.orm.nodes.data.structure import Site
 from aiida_siesta.utils.structures import find_mid_path_position
 from aiida_siesta.utils.structures import find_intermediate_structure
-from aiida_siesta.utils.interpol import interpolate_two_structures_ase
+from aiida_siesta.utils.structures import get_kinds_raw
+from aiida_siesta.utils.interpol import interpolate_two_structures_positions, path_trajectory
 
 class VacancyExchangeBarrierWorkChain(WorkChain):
 
     """
     Workchain to compute the barrier for exchange of a vacancy and an atom
     in a structure. 
+
+    The end-point relaxations of related runs are often identical. To reuse
+    them, enable caching of the Siesta calculations in the profile
+    (these calculations are launched by the SiestaBaseWorkChains, outside the
+    steps of this workchain, so they cannot be enabled from here). With
+    aiida-core 1.6 or later, run
+    `verdi config set caching.enabled_for aiida.calculations:siesta.siesta`.
+    With earlier versions, add to the `cache_config.yml` file of the AiiDA
+    configuration folder (e.g. `~/.aiida/cache_config.yml`):
+
+        <profile name>:
+          enabled:
+            - aiida.calculations:siesta.siesta
     """
 
     @classmethod
@@ -41,21 +54,21 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
         spec.input('migration_direction', valid_type=orm.List, required=False,
                    help='Migration direction (in lattice coordinates)')
 
-        spec.input('n_images', valid_type=orm.Int,
-                   help='Number of (internal) images in Path (odd!!)') # validate
+        spec.input('n_images', valid_type=orm.Int, validator=validate_odd_n_images,
+                   help='Number of (internal) images in Path (odd!!)')
 
         spec.expose_outputs(SiestaBaseNEBWorkChain)
 
         spec.outline(
 
             cls.prepare_structures,
-            cls.relax_initial,
-            cls.relax_final,
+            cls.relax_endpoints,
             cls.prepare_initial_path,
             cls.run_NEB_workchain,
             cls.check_results
         )
         
+        spec.exit_code(150, 'ERROR_SITES', message='The vacancy and atom indices must be different')
         spec.exit_code(200, 'ERROR_MAIN_WC', message='The end-point relaxation SiestaBaseWorkChain failed')
         spec.exit_code(250, 'ERROR_CONFIG', message='Cannot generate initial path correctly')
         spec.exit_code(300, 'ERROR_NEB_WK', message='SiestaBaseNEBWorkChain did not finish correctly')
@@ -73,37 +86,44 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
         iv = self.inputs.vacancy_index.value
         ia = self.inputs.atom_index.value
 
+        if ia == iv:
+            self.report(f'The atom and the vacancy are the same site ({ia})')
+            return self.exit_codes.ERROR_SITES
+
         sites = s_host.sites
-        atom_site = sites[ia]
         
         s_initial = s_host.clone()
         s_initial.clear_sites()
         
         new_sites = sites
         vacancy_site = new_sites.pop(iv)     # Remove site from list
-        vacancy_position = vacancy_site.position
+        vacancy_position = tuple(float(x) for x in vacancy_site.position)  # Plain floats, cheap to keep in the context
         
-        [ s_initial.append_site(s) for s in new_sites ]
-        new_ia = new_sites.index(atom_site)  # Atom index might have changed with removal of vacancy
+        for s in new_sites:
+            s_initial.append_site(s)
 
-        # Insert site with final position of atom in place of the original.
-        new_atom_site = Site(kind_name=atom_site.kind_name, position=vacancy_position)
-        new_sites[new_ia] = new_atom_site
-        
-        s_final = s_initial.clone()
-        s_final.clear_sites()
-        [ s_final.append_site(s) for s in new_sites ]
+        new_ia = ia - (1 if ia > iv else 0)  # Atom index shifts down if the vacancy was before it
+
+        # The final structure differs from the initial one only in the site
+        # of the atom, now at the position of the original vacancy. Only that
+        # raw site is replaced, the rest of the sites are not rebuilt
+        s_final = find_intermediate_structure(s_initial, new_ia, vacancy_position)
 
         self.ctx.s_initial = s_initial
         self.ctx.s_final = s_final
+        # The relaxations do not change the kinds, so their 'serializable'
+        # form, needed later for the path, is computed only once here
+        self.ctx.kinds_raw = get_kinds_raw(s_initial)
         self.ctx.vacancy_position = vacancy_position
         self.ctx.atom_site_index = new_ia
 
-        self.report(f'Created initial and final structures')
+        self.logger.debug('Created initial and final structures')
 
-    def relax_initial(self):
+    def relax_endpoints(self):
         """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
+        Run the SiestaBaseWorkChains for the initial and final structures, might
+        be relaxations or scf only. Both are submitted in the same step, so that
+        they run concurrently.
         """
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
@@ -119,24 +139,17 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
         ###   original_params = inputs['parameters'].get_dict()
 
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the initial structure.')
-
-        return ToContext(initial_relaxation_wk=running)
-
-    def relax_final(self):
-        """
-        Run the SiestaBaseWorkChain, might be a relaxation or a scf only.
-        """
+        running_initial = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_initial.pk}> to relax the initial structure.')
 
         inputs = self.exposed_inputs(SiestaBaseWorkChain,
                                      namespace='final')
         inputs['structure'] = self.ctx.s_final
 
-        running = self.submit(SiestaBaseWorkChain, **inputs)
-        self.report(f'Launched SiestaBaseWorkChain<{running.pk}> to relax the final structure.')
+        running_final = self.submit(SiestaBaseWorkChain, **inputs)
+        self.report(f'Launched SiestaBaseWorkChain<{running_final.pk}> to relax the final structure.')
 
-        return ToContext(final_relaxation_wk=running)
+        return ToContext(initial_relaxation_wk=running_initial, final_relaxation_wk=running_final)
 
 
     def prepare_initial_path(self):
@@ -167,7 +180,8 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
 
             migration_direction = self.inputs.migration_direction.get_list()
 
-            pos1 = s_initial.sites[self.ctx.atom_site_index].position
+            # Only the raw site of the moving atom is read, not all the Site objects
+            pos1 = s_initial.get_attribute('sites')[self.ctx.atom_site_index]['position']
             pos2 = self.ctx.vacancy_position
             atom_mid_path_position = find_mid_path_position(s_initial,
                                                             pos1, pos2,
@@ -178,32 +192,25 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
                                                          self.ctx.atom_site_index,
                                                          atom_mid_path_position)
     
-            # The starting_path is now built from two sections
-            # We assume that the number of internal images is odd,
-            # so that n_images // 2 is the number of internal images
-            # of each section
-
-            first_list = interpolate_two_structures_ase(s_initial,
-                                                        s_intermediate,
-                                                        n_images//2)
-            second_list = interpolate_two_structures_ase(s_intermediate,
-                                                         s_final,
-                                                         n_images//2)
-
-            #
-            # Remove duplicate central point
-            #
-            images_list = first_list[:-1] + second_list
-        
-            if len(images_list) != n_images+2:
-                self.report(f"Number of images: {n_images} /= list length")
+            # The starting_path goes through the intermediate structure,
+            # which is the central image. It is seeded linearly in two sections
+            # and then optimized by idpp in a single run, as a whole path.
+            # The number of internal images must be odd
+            
+            try:
+                frames = interpolate_two_structures_positions(s_initial,
+                                                              s_final,
+                                                              n_images, method="idpp",
+                                                              s_mid=s_intermediate)
+            except ValueError as exc:
+                self.report(f"Cannot build the path for {n_images} images: {exc}")
                 return self.exit_codes.ERROR_CONFIG
 
         else:
             # Just normal (idpp) interpolation
-            images_list = interpolate_two_structures_ase(s_initial,
-                                                        s_final,
-                                                        n_images)
+            frames = interpolate_two_structures_positions(s_initial,
+                                                          s_final,
+                                                          n_images, method="idpp")
             
             
         #
@@ -213,13 +220,10 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
         # refined_path = refine_neb_path(starting_path)
         
 
-        path_object = orm.TrajectoryData(images_list)
+        # The path is built directly from the stacked positions, annotated
+        # with a 'serializable' dictionary instead of the actual kinds list
         #
-        # Use a 'serializable' dictionary instead of the 
-        # actual kinds list
-        #
-        _kinds_raw = [ k.get_raw() for k in s_initial.kinds ]
-        path_object.set_attribute('kinds', _kinds_raw)
+        path_object = path_trajectory(s_initial, s_final, frames, kinds_raw=self.ctx.kinds_raw)
         
         self.ctx.path = path_object
 
@@ -230,8 +234,8 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
 
         inputs = self.exposed_inputs(SiestaBaseNEBWorkChain, namespace='neb')
 
-        print(inputs)
-        
+        self.logger.debug('Inputs of the NEB workchain: %s', list(inputs.keys()))
+
         inputs['starting_path'] = self.ctx.path
 
         running = self.submit(SiestaBaseNEBWorkChain, **inputs)
@@ -249,8 +253,7 @@ class VacancyExchangeBarrierWorkChain(WorkChain):
         if not self.ctx.neb_wk.is_finished_ok:
                 return self.exit_codes.ERROR_NEB_WK
 
-        outps = self.ctx.neb_wk.outputs
-        self.out('neb_output_package', outps['neb_output_package'])
+        self.out('neb_output_package', self.ctx.neb_wk.outputs.neb_output_package)
 
         self.report(f'VacancyExchangeBarrier workchain done.')
             
@@ -3,6 +3,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 import os.path as op
+import pytest
 from aiida import orm
 from aiida.common import datastructures
 from aiida.tools import get_explicit_kpoints_path
@@ -108,6 +109,82 @@ def test_base(aiida_profile, fixture_sandbox, generate_calc_job,
 #    remote_copy_list = ["as.DM"]
 #    assert sorted(calc_info.remote_copy_list) == sorted(remote_copy_list)
 
+def test_shared_pseudo(aiida_profile, fixture_sandbox, generate_calc_job,
+    fixture_code, generate_structure, generate_kpoints_mesh, generate_basis,
+    generate_param, generate_psf_data):
+    """
+    Test that a pseudo shared by two kinds is copied only once and
+    the file of the second kind is a symlink to the first.
+    """
+
+    entry_point_name = 'siesta.siesta'
+
+    psf = generate_psf_data('Si')
+
+    inputs = {
+        'code': fixture_code(entry_point_name),
+        'structure': generate_structure(),
+        'kpoints': generate_kpoints_mesh(2),
+        'parameters': generate_param(),
+        'basis': generate_basis(),
+        'pseudos': {
+            'Si': psf,
+            'SiDiff': psf
+        },
+        'metadata': {
+            'options': {
+               'resources': {'num_machines': 1  },
+               'max_wallclock_seconds': 1800,
+               'withmpi': False,
+               }
+        }
+    }
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert calc_info.local_copy_list == [(psf.uuid, psf.filename, 'Si.psf')]
+    assert calc_info.prepend_text == 'ln -s Si.psf SiDiff.psf'
+
+
+def test_shared_pseudo_three_kinds(aiida_profile, fixture_sandbox, generate_calc_job,
+    fixture_code, generate_structure, generate_kpoints_mesh, generate_param, generate_psf_data):
+    """
+    Test that, with three kinds sharing a pseudo, the pseudo is copied once
+    and a symlink is created for each of the other two kinds.
+    """
+
+    entry_point_name = 'siesta.siesta'
+
+    psf = generate_psf_data('Si')
+
+    structure = generate_structure()
+    structure.append_atom(position=(1.3575, 0., 0.), symbols='Si', name='Si_b')
+
+    inputs = {
+        'code': fixture_code(entry_point_name),
+        'structure': structure,
+        'kpoints': generate_kpoints_mesh(2),
+        'parameters': generate_param(),
+        'pseudos': {
+            'Si': psf,
+            'SiDiff': psf,
+            'Si_b': psf
+        },
+        'metadata': {
+            'options': {
+               'resources': {'num_machines': 1  },
+               'max_wallclock_seconds': 1800,
+               'withmpi': False,
+               }
+        }
+    }
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert calc_info.local_copy_list == [(psf.uuid, psf.filename, 'Si.psf')]
+    assert calc_info.prepend_text == 'ln -s Si.psf SiDiff.psf\nln -s Si.psf Si_b.psf'
+
+
 # Should be extended to all the blocked_keyworld
 def test_blocked_keyword(aiida_profile, fixture_sandbox, generate_calc_job, 
     fixture_code, generate_structure, generate_kpoints_mesh, generate_basis,
@@ -310,3 +387,81 @@ def test_bandspoints(aiida_profile, fixture_sandbox, generate_calc_job,
 
     file_regression.check(input_written, encoding='utf-8', extension='.fdf')
 
+
+
+@pytest.mark.parametrize('pao_key', ['%block PAO-Basis', 'pao-basis-size'])
+def test_pao_in_parameters(aiida_profile, fixture_sandbox, generate_calc_job,
+    fixture_code, generate_structure, generate_kpoints_mesh, generate_basis,
+    generate_param, generate_psf_data, pao_key):
+    """
+    Test that PAO options in the parameters, also as blocks, are rejected
+    """
+
+    from aiida.common import InputValidationError
+
+    entry_point_name = 'siesta.siesta'
+
+    psf = generate_psf_data('Si')
+
+    parameters = generate_param()
+    parameters.set_attribute(pao_key, "whatever")
+
+    inputs = {
+        'code': fixture_code(entry_point_name),
+        'structure': generate_structure(),
+        'kpoints': generate_kpoints_mesh(2),
+        'parameters': parameters,
+        'basis': generate_basis(),
+        'pseudos': {
+            'Si': psf,
+            'SiDiff': psf
+        },
+        'metadata': {
+            'options': {
+               'resources': {'num_machines': 1  },
+               'max_wallclock_seconds': 1800,
+               'withmpi': False,
+               }
+        }
+    }
+
+    with pytest.raises(InputValidationError):
+        generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+
+def test_repeated_settings_keys(aiida_profile, fixture_sandbox, generate_calc_job,
+    fixture_code, generate_structure, generate_kpoints_mesh, generate_basis,
+    generate_param, generate_psf_data):
+    """
+    Test that settings keys repeated case-insensitively are reported
+    with an InputValidationError naming them
+    """
+
+    from aiida.common import InputValidationError
+
+    entry_point_name = 'siesta.siesta'
+
+    psf = generate_psf_data('Si')
+
+    inputs = {
+        'code': fixture_code(entry_point_name),
+        'structure': generate_structure(),
+        'kpoints': generate_kpoints_mesh(2),
+        'parameters': generate_param(),
+        'basis': generate_basis(),
+        'settings': orm.Dict(dict={'cmdline': ['-v'], 'CMDLINE': ['-v']}),
+        'pseudos': {
+            'Si': psf,
+            'SiDiff': psf
+        },
+        'metadata': {
+            'options': {
+               'resources': {'num_machines': 1  },
+               'max_wallclock_seconds': 1800,
+               'withmpi': False,
+               }
+        }
+    }
+
+    with pytest.raises(InputValidationError, match="CMDLINE"):
+        generate_calc_job(fixture_sandbox, entry_point_name, inputs)
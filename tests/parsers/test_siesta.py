@@ -2,8 +2,25 @@ import pytest
 from aiida import orm
 from aiida.common import AttributeDict
 
+
+@pytest.fixture(scope='module')
+def structure(aiida_profile):
+    """
+    The silicon structure of `generate_structure`, built once for all the tests
+    of this module (none of them modifies it). The shared fixture is function
+    scoped, so it cannot be requested here.
+    """
+    param = 5.43
+    cell = [[param / 2., param / 2., 0], [param / 2., 0, param / 2.], [0, param / 2., param / 2.]]
+    structure = orm.StructureData(cell=cell)
+    structure.append_atom(position=(0., 0., 0.), symbols='Si', name='Si')
+    structure.append_atom(position=(param / 4., param / 4., param / 4.), symbols='Si', name='SiDiff')
+
+    return structure
+
+
 def test_siesta_default(aiida_profile, fixture_localhost, generate_calc_job_node, 
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test a parser of a siesta calculation.
     The output is created by running a dead simple SCF calculation for a silicon structure. 
@@ -16,8 +33,6 @@ def test_siesta_default(aiida_profile, fixture_localhost, generate_calc_job_node
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
-
     inputs = AttributeDict({
         'structure': structure
     })
@@ -45,7 +60,7 @@ def test_siesta_default(aiida_profile, fixture_localhost, generate_calc_job_node
 
 
 def test_siesta_no_ion(aiida_profile, fixture_localhost, generate_calc_job_node, 
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test a parser of a siesta calculation, but the .ion.xml are not found
     """
@@ -54,8 +69,6 @@ def test_siesta_no_ion(aiida_profile, fixture_localhost, generate_calc_job_node,
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
-
     inputs = AttributeDict({
         'structure': structure
     })
@@ -70,14 +83,15 @@ def test_siesta_no_ion(aiida_profile, fixture_localhost, generate_calc_job_node,
     assert calcfunction.exception is None
     assert calcfunction.is_finished_ok
     assert calcfunction.exit_message is None
-    assert len(orm.Log.objects.get_logs_for(node)) == 2
-    assert "no ion file retrieved" in orm.Log.objects.get_logs_for(node)[0].message
+    logs = orm.Log.objects.get_logs_for(node)
+    assert len(logs) == 2
+    assert "no ion file retrieved" in logs[0].message
 
 
 # As it is implemented now, there is no point to test also the case bandslines as
 # I assert the attributes of bands, not the actual array!
 def test_siesta_bandspoints(aiida_profile, fixture_localhost, generate_calc_job_node,
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test parsing of bands in a siesta calculation when the bandspoints option is set in the submission file.
     Also the time.json and MESSAGES file are added, therefore their parsing is tested as well. The MESSAGES
@@ -88,7 +102,6 @@ def test_siesta_bandspoints(aiida_profile, fixture_localhost, generate_calc_job_
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
     bandskpoints = orm.KpointsData()
     kpp = [(0.500,  0.250, 0.750), (0.500,  0.500, 0.500), (0., 0., 0.)]
     bandskpoints.set_cell(structure.cell, structure.pbc)
@@ -123,7 +136,7 @@ def test_siesta_bandspoints(aiida_profile, fixture_localhost, generate_calc_job_
 
 
 def test_siesta_empty_messages(aiida_profile, fixture_localhost, generate_calc_job_node, 
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     An empty MESSAGES file is parsed. The parser goes through all the error checks but no
     recognizable error is detected. Therefore the calculation finishes with UNEXPECTED_TERMINATION
@@ -137,8 +150,6 @@ def test_siesta_empty_messages(aiida_profile, fixture_localhost, generate_calc_j
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
-
     inputs = AttributeDict({
         'structure': structure
     })
@@ -153,8 +164,8 @@ def test_siesta_empty_messages(aiida_profile, fixture_localhost, generate_calc_j
     assert calcfunction.exception is None
     assert not calcfunction.is_finished_ok
     assert calcfunction.exit_message == 'Statement "Job completed" not detected, unknown error'
-    logs = orm.Log.objects.get_logs_for(node)[0]
-    assert "Job completed" in logs.message
+    message = orm.Log.objects.get_logs_for(node)[0].message
+    assert "Job completed" in message
     assert 'forces_and_stress' in results
     assert 'output_parameters' in results
     assert 'output_structure' in results
@@ -166,7 +177,7 @@ def test_siesta_empty_messages(aiida_profile, fixture_localhost, generate_calc_j
 
 
 def test_siesta_no_scf_conv(aiida_profile, fixture_localhost, generate_calc_job_node,
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test a parser in the situation when siesta stops with "SCF_NOT_CONV" situation. It is produced with
     modern versions of the code that return "FATAL" in this case (unless scf-must-converge F) is set by the
@@ -178,8 +189,6 @@ def test_siesta_no_scf_conv(aiida_profile, fixture_localhost, generate_calc_job_
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
-
     inputs = AttributeDict({
         'structure': structure
     })
@@ -195,10 +204,8 @@ def test_siesta_no_scf_conv(aiida_profile, fixture_localhost, generate_calc_job_
     assert not calcfunction.is_finished_ok
     assert calcfunction.exit_message == 'Calculation did not reach scf convergence!'
     logs = orm.Log.objects.get_logs_for(node)
-    for log in logs:
-        if "SCF_NOT_CONV" in log.message:
-            mylog=log
-    assert "SCF_NOT_CONV" in mylog.message
+    mylog = next((log for log in logs if "SCF_NOT_CONV" in log.message), None)
+    assert mylog is not None
     assert 'output_parameters' in results
 
     data_regression.check({'output_parameters': results['output_parameters'].get_dict()})
@@ -206,7 +213,7 @@ def test_siesta_no_scf_conv(aiida_profile, fixture_localhost, generate_calc_job_
 
 
 def test_siesta_no_geom_conv(aiida_profile, fixture_localhost, generate_calc_job_node,
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test a parser in the situation when siesta stops with "GEOM_NOT_CONV" situation. It is produced with
     modern versions of the code that return "FATAL" in this case (unless scf-must-converge F) is set by the
@@ -218,8 +225,6 @@ def test_siesta_no_geom_conv(aiida_profile, fixture_localhost, generate_calc_job
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
-
     inputs = AttributeDict({
         'structure': structure
     })
@@ -235,10 +240,8 @@ def test_siesta_no_geom_conv(aiida_profile, fixture_localhost, generate_calc_job
     assert not calcfunction.is_finished_ok
     assert calcfunction.exit_message == 'Calculation did not reach geometry convergence!'
     logs = orm.Log.objects.get_logs_for(node)
-    for log in logs:
-        if "GEOM_NOT_CONV" in log.message:
-            mylog=log
-    assert "GEOM_NOT_CONV" in mylog.message
+    mylog = next((log for log in logs if "GEOM_NOT_CONV" in log.message), None)
+    assert mylog is not None
     assert 'output_parameters' in results
     assert 'output_structure' in results
 
@@ -246,7 +249,7 @@ def test_siesta_no_geom_conv(aiida_profile, fixture_localhost, generate_calc_job
 
 
 def test_siesta_bands_error(aiida_profile, fixture_localhost, generate_calc_job_node,
-    generate_parser, generate_structure, data_regression):
+    generate_parser, structure, data_regression):
     """
     Test parsing of bands in a situation when the bands file is truncated.
     Also the time.json and MESSAGES file are added, therefore their parsing is tested as well. The MESSAGES
@@ -257,7 +260,6 @@ def test_siesta_bands_error(aiida_profile, fixture_localhost, generate_calc_job_
     entry_point_calc_job = 'siesta.siesta'
     entry_point_parser = 'siesta.parser'
 
-    structure=generate_structure()
     bandskpoints = orm.KpointsData()
     kpp = [(0.500,  0.250, 0.750), (0.500,  0.500, 0.500), (0., 0., 0.)]
     bandskpoints.set_cell(structure.cell, structure.pbc)
@@ -0,0 +1,18 @@
+#!/usr/bin/env runaiida
+import uuid
+from aiida_siesta.utils.files import get_or_create_singlefile_from_bytes
+
+
+def test_get_or_create_singlefile_from_bytes(aiida_profile):
+    """Test that nodes are reused only for the same content and file name."""
+    content = uuid.uuid4().hex.encode()
+
+    node = get_or_create_singlefile_from_bytes(content, 'script.lua')
+    assert node.is_stored
+    assert get_or_create_singlefile_from_bytes(content, 'script.lua').pk == node.pk
+
+    other = get_or_create_singlefile_from_bytes(content, 'other.lua')
+    assert other.pk != node.pk
+    assert other.filename == 'other.lua'
+
+    assert not get_or_create_singlefile_from_bytes(content, 'script.lua', store=False).is_stored
@@ -0,0 +1,70 @@
+#!/usr/bin/env runaiida
+import copy
+import numpy as np
+import pytest
+from aiida import orm
+from aiida_siesta.utils.interpol import _interpolate_arrays, interpolate_path
+
+CELL = [[5.43, 0., 0.], [0., 5.43, 0.], [0., 0., 5.43]]
+PBC = (True, True, True)
+P1 = np.array([[0., 0., 0.], [1.3575, 1.3575, 1.3575]])
+P2 = np.array([[0., 0., 0.], [2.715, 1.3575, 0.]])
+
+
+def test_linear():
+    """Test that the linear frames are those of `linspace`, with the exact end points."""
+    frames = _interpolate_arrays(P1, P2, CELL, PBC, 3, method="linear")
+
+    assert frames.shape == (5, 2, 3)
+    assert np.allclose(frames, np.linspace(P1, P2, 5))
+    assert np.array_equal(frames[0], P1)
+    assert np.array_equal(frames[-1], P2)
+
+
+def test_linear_waypoint():
+    """Test that the path goes through the waypoint, which is the central image."""
+    waypoint = np.array([[0., 0., 0.], [2.5, 2.5, 1.]])
+    frames = _interpolate_arrays(P1, P2, CELL, PBC, 3, method="linear", waypoint=waypoint)
+
+    assert frames.shape == (5, 2, 3)
+    assert np.allclose(frames[2], waypoint)
+
+
+def test_even_waypoint():
+    """Test that an even number of images cannot go through a waypoint."""
+    with pytest.raises(ValueError):
+        _interpolate_arrays(P1, P2, CELL, PBC, 4, method="linear", waypoint=(P1 + P2) / 2)
+
+
+@pytest.mark.parametrize('method', ['IDPP', 'ipdd', 'geodesic'])
+def test_unknown_method(method):
+    """Test that unknown methods are rejected instead of falling back to linear."""
+    with pytest.raises(ValueError):
+        _interpolate_arrays(P1, P2, CELL, PBC, 3, method=method)
+
+
+def test_idpp():
+    """Test the shape of the idpp frames, with the exact end points."""
+    frames = _interpolate_arrays(P1, P2, CELL, PBC, 3, method="idpp")
+
+    assert frames.shape == (5, 2, 3)
+    assert np.array_equal(frames[0], P1)
+    assert np.array_equal(frames[-1], P2)
+
+
+def test_interpolate_path(aiida_profile, generate_structure):
+    """Test the annotations of the path generated by the calcfunction."""
+    initial = generate_structure()
+    final = generate_structure()
+    # Only the second atom moves
+    sites = copy.deepcopy(initial.get_attribute('sites'))
+    sites[1]['position'] = [x + 0.2 for x in sites[1]['position']]
+    final.set_attribute('sites', sites)
+
+    path = interpolate_path(initial, final, orm.Int(3), orm.Str('linear'))
+
+    assert isinstance(path, orm.TrajectoryData)
+    assert path.numsteps == 5
+    assert path.get_attribute('kinds') == initial.get_attribute('kinds')
+    assert path.get_attribute('interpolation_method') == 'linear'
+    assert np.allclose(path.get_positions()[-1], [site.position for site in final.sites])
@@ -0,0 +1,88 @@
+#!/usr/bin/env runaiida
+import uuid
+import pytest
+from plumpy import ProcessState
+from aiida import orm
+from aiida_siesta.workflows.interstitial_barrier import check_interstitial_positions, find_previous_run, get_inputs_key
+from aiida_siesta.workflows.interstitial_barrier import _INPUTS_KEY_EXTRA
+
+
+def _generate_inputs(label, n_images=3, reuse=None):
+    """Inputs of a mock run, made unique to this test by the label"""
+    inputs = {
+        'interstitial_symbol': orm.Str(label),
+        'n_images': orm.Int(n_images),
+    }
+    if reuse is not None:
+        inputs['reuse_previous_run'] = orm.Bool(reuse)
+    return inputs
+
+
+def test_previous_run_hit(aiida_profile, fixture_localhost, generate_wc_job_node):
+    """Test that a finished run with the same inputs is found, whatever the reuse input."""
+    label = uuid.uuid4().hex
+
+    previous = generate_wc_job_node('siesta.interstitial', fixture_localhost, _generate_inputs(label))
+    inputs_key = get_inputs_key(previous)
+    previous.set_process_state(ProcessState.FINISHED)
+    previous.set_exit_status(0)
+    previous.set_extra(_INPUTS_KEY_EXTRA, inputs_key)
+
+    new = generate_wc_job_node('siesta.interstitial', fixture_localhost, _generate_inputs(label, reuse=True))
+
+    assert get_inputs_key(new) == inputs_key
+    assert find_previous_run(new, inputs_key).pk == previous.pk
+
+
+def test_previous_run_miss(aiida_profile, fixture_localhost, generate_wc_job_node):
+    """Test that runs with other inputs, or failed, are not found."""
+    label = uuid.uuid4().hex
+
+    previous = generate_wc_job_node('siesta.interstitial', fixture_localhost, _generate_inputs(label))
+    inputs_key = get_inputs_key(previous)
+    previous.set_process_state(ProcessState.FINISHED)
+    previous.set_exit_status(300)
+    previous.set_extra(_INPUTS_KEY_EXTRA, inputs_key)
+
+    # Same inputs, but the previous run failed
+    new = generate_wc_job_node('siesta.interstitial', fixture_localhost, _generate_inputs(label))
+    assert find_previous_run(new, get_inputs_key(new)) is None
+
+    # Different inputs
+    other = generate_wc_job_node('siesta.interstitial', fixture_localhost, _generate_inputs(label, n_images=5))
+    assert get_inputs_key(other) != inputs_key
+    assert find_previous_run(other, get_inputs_key(other)) is None
+
+
+def test_check_interstitial_positions(aiida_profile, generate_structure):
+    """Test the checks of the interstitial positions in a silicon host."""
+    host = generate_structure()
+    # Tetrahedral site, at a bond length from the closest Si atoms
+    valid = [2.715, 2.715, 2.715]
+
+    assert check_interstitial_positions(host, 'H', (valid, valid)) is None
+
+
+@pytest.mark.parametrize('position', [[0.1, 0., 0.], [1.4575, 1.3575, 1.3575]])
+def test_check_interstitial_positions_overlap(aiida_profile, generate_structure, position):
+    """Test that positions on top of a host atom are rejected."""
+    host = generate_structure()
+
+    message = check_interstitial_positions(host, 'H', ([2.715, 2.715, 2.715], position))
+    assert 'overlaps' in message
+
+
+@pytest.mark.parametrize('position', [[0., 0.], [True, 0., 0.], ['a', 0., 0.]])
+def test_check_interstitial_positions_malformed(aiida_profile, generate_structure, position):
+    """Test that positions which are not three numbers are rejected."""
+    host = generate_structure()
+
+    message = check_interstitial_positions(host, 'H', (position, [2.715, 2.715, 2.715]))
+    assert 'not a list of three numbers' in message
+
+
+def test_check_interstitial_positions_symbol(aiida_profile, generate_structure):
+    """Test that unknown elements are rejected."""
+    host = generate_structure()
+
+    assert 'Unknown chemical symbol' in check_interstitial_positions(host, 'Xx', ([2.715, 2.715, 2.715],))
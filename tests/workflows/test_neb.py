@@ -0,0 +1,40 @@
+#!/usr/bin/env runaiida
+import pytest
+from aiida import orm
+from aiida_siesta.workflows.neb import NEBWorkChain, NEBSweepWorkChain
+from aiida_siesta.workflows.neb import validate_interpolation_method, validate_interpolation_methods
+
+
+@pytest.mark.parametrize('methods', [['idpp'], ['linear'], ['idpp', 'linear']])
+def test_validate_interpolation_methods(aiida_profile, methods):
+    """Test `validate_interpolation_methods` for valid lists of methods."""
+    assert validate_interpolation_methods(orm.List(list=methods), None) is None
+
+
+@pytest.mark.parametrize('methods', [[], ['IDPP'], ['geodesic', 'linear'], ['idpp', 'idpp']])
+def test_validate_interpolation_methods_wrong(aiida_profile, methods):
+    """Test `validate_interpolation_methods` for empty, unknown and repeated methods."""
+    assert validate_interpolation_methods(orm.List(list=methods), None) is not None
+
+
+def test_validate_interpolation_method(aiida_profile):
+    """Test `validate_interpolation_method` of `NEBWorkChain`."""
+    assert validate_interpolation_method(orm.Str('idpp'), None) is None
+    assert validate_interpolation_method(orm.Str('linear'), None) is None
+    assert validate_interpolation_method(orm.Str('ipdd'), None) is not None
+
+
+def test_neb_sweep_spec(aiida_profile):
+    """Test the inputs of `NEBSweepWorkChain`, shared with `NEBWorkChain` for the end-points."""
+    spec = NEBSweepWorkChain.spec()
+
+    for name in ('initial', 'final', 'neb', 'initial_structure', 'final_structure', 'n_images'):
+        assert name in spec.inputs
+        assert name in NEBWorkChain.spec().inputs
+    assert 'starting_path' not in spec.inputs['neb']
+
+    port = spec.inputs['interpolation_methods']
+    assert port.default().get_list() == ['idpp', 'linear']
+    assert port.validate(orm.List(list=['linear'])) is None
+    assert port.validate(orm.List(list=['linear', 'linear'])) is not None
+    assert port.validate(orm.List(list=['geodesic'])) is not None